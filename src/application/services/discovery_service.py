@@ -1,6 +1,8 @@
 """Discovery service"""
 
-from typing import List
+from typing import Callable, Dict, List, Optional
+from datetime import timedelta
+import asyncio
 import logging
 
 from domain.discovery.repositories import (
@@ -29,10 +31,19 @@ class DiscoveryService:
         bot_repo: BotRepository,
         server_repo: ServerRepository,
         template_repo: TemplateRepository,
+        cache_ttls: Optional[Dict[str, timedelta]] = None,
     ):
+        """
+        Args:
+            bot_repo: Bot repository
+            server_repo: Server repository
+            template_repo: Template repository
+            cache_ttls: Collection TTLs keyed by resource ("bots", "servers", "templates")
+        """
         self._bot_repo = bot_repo
         self._server_repo = server_repo
         self._template_repo = template_repo
+        self._cache_ttls = cache_ttls or {}
 
     async def list_bots(
         self,
@@ -53,7 +64,7 @@ class DiscoveryService:
 
         bots = await self._bot_repo.find_all()
 
-        collection = BotCollection()
+        collection = BotCollection(cache_ttl=self._cache_ttl("bots"))
         collection.load(bots)
 
         if filter_criteria:
@@ -100,7 +111,7 @@ class DiscoveryService:
 
         servers = await self._server_repo.find_all()
 
-        collection = ServerCollection()
+        collection = ServerCollection(cache_ttl=self._cache_ttl("servers"))
         collection.load(servers)
 
         if filter_criteria:
@@ -135,7 +146,7 @@ class DiscoveryService:
 
         templates = await self._template_repo.find_all()
 
-        collection = TemplateCollection()
+        collection = TemplateCollection(cache_ttl=self._cache_ttl("templates"))
         collection.load(templates)
 
         if filter_criteria:
@@ -159,9 +170,46 @@ class DiscoveryService:
 
         return template
 
+    def _cache_ttl(self, resource: str) -> timedelta:
+        """Collection TTL of a resource"""
+        return self._cache_ttls.get(resource, timedelta(seconds=60))
+
     async def clear_all_caches(self):
         """Clear all cache"""
         logger.info("Clearing all caches")
         await self._bot_repo.clear_cache()
         await self._server_repo.clear_cache()
         await self._template_repo.clear_cache()
+
+    async def wait_for_bot_refresh(self) -> bool:
+        """Wait for a background Bot refresh, True if newer data was loaded"""
+        return await self._bot_repo.wait_for_refresh()
+
+    async def wait_for_server_refresh(self) -> bool:
+        """Wait for a background server refresh, True if newer data was loaded"""
+        return await self._server_repo.wait_for_refresh()
+
+    async def wait_for_template_refresh(self) -> bool:
+        """Wait for a background template refresh, True if newer data was loaded"""
+        return await self._template_repo.wait_for_refresh()
+
+    def add_catalog_refresh_listener(self, listener: Callable[[], None]) -> None:
+        """Call listener after each successful Bot or server catalog refresh"""
+        self._bot_repo.add_refresh_listener(listener)
+        self._server_repo.add_refresh_listener(listener)
+
+    async def restore_snapshots(self) -> None:
+        """Restore persisted catalog snapshots for instant first paint"""
+        logger.info("Restoring catalog snapshots")
+        await asyncio.gather(
+            self._bot_repo.restore_snapshot(),
+            self._server_repo.restore_snapshot(),
+            self._template_repo.restore_snapshot(),
+        )
+
+    async def save_snapshots(self) -> None:
+        """Persist current catalog snapshots"""
+        logger.info("Saving catalog snapshots")
+        await self._bot_repo.save_snapshot()
+        await self._server_repo.save_snapshot()
+        await self._template_repo.save_snapshot()
@@ -1,7 +1,7 @@
 """Bot repository interface"""
 
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Callable, List, Optional
 from ..entities import Bot
 
 
@@ -22,3 +22,23 @@ class BotRepository(ABC):
     async def clear_cache(self) -> None:
         """Clear cache"""
         pass
+
+    @abstractmethod
+    async def wait_for_refresh(self) -> bool:
+        """Wait for a background refresh, True if newer data was loaded"""
+        pass
+
+    @abstractmethod
+    def add_refresh_listener(self, listener: Callable[[], None]) -> None:
+        """Call listener after each successful refresh"""
+        pass
+
+    @abstractmethod
+    async def restore_snapshot(self) -> bool:
+        """Restore the persisted snapshot, True if one was restored"""
+        pass
+
+    @abstractmethod
+    async def save_snapshot(self) -> None:
+        """Persist the current data as snapshot"""
+        pass
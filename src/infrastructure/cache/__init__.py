@@ -3,9 +3,14 @@
 from .cache_manager import CacheManager
 from .json_cache import JsonCacheManager
 from .memory_cache import MemoryCacheManager
+from .negative_cache import NegativeCache, CachedFailureError
+from .catalog_cache import CatalogCache
 
 __all__ = [
     "CacheManager",
     "JsonCacheManager",
     "MemoryCacheManager",
+    "NegativeCache",
+    "CachedFailureError",
+    "CatalogCache",
 ]
@@ -0,0 +1,223 @@
+"""Catalog cache"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, List, Optional, TypeVar
+import logging
+from .cache_manager import CacheManager
+from .negative_cache import NegativeCache
+from ..config.cache_policy import ResourceTtl
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CatalogCache(Generic[T]):
+    """Cache of a whole catalog resource (bots, servers, templates)
+
+    Fresh entries are served as-is. Stale entries within the ``max_stale``
+    window are served immediately while a background refresh revalidates
+    them. Failed fetches and unknown IDs are negatively cached; unknown IDs
+    only for the catalog entry they were looked up in, so a refresh or
+    ``clear`` lets them be found again.
+
+    The last good entry is also kept as a snapshot in a persistent cache,
+    so it can be restored on the next start before anything is fetched.
+    """
+
+    def __init__(
+        self,
+        resource: str,
+        cache_manager: CacheManager,
+        negative_cache: NegativeCache,
+        ttl: ResourceTtl,
+        serialize: Callable[[T], dict],
+        deserialize: Callable[[dict], T],
+        snapshot_cache: Optional[CacheManager] = None,
+        snapshot_ttl: int = 30 * 24 * 3600,
+    ):
+        self._resource = resource
+        self._key = f"{resource}:all"
+        # Unknown ID, fetched_at of the entry it was missing from
+        self._missing_key = f"{resource}:missing:{{}}:{{}}"
+        self._cache = cache_manager
+        self._negative = negative_cache
+        self._ttl = ttl
+        self._serialize = serialize
+        self._deserialize = deserialize
+        self._snapshot_cache = snapshot_cache
+        self._snapshot_ttl = snapshot_ttl
+
+        # (fetched_at, items) of the last entry mapped to domain objects
+        self._memo: Optional[tuple] = None
+        # Shared in-flight refresh, awaited by foreground callers
+        self._refresh_task: Optional[asyncio.Task] = None
+        # fetched_at of the entry last returned by get_all
+        self._served_at: Optional[float] = None
+        # Called after each successful refresh
+        self._refresh_listeners: List[Callable[[], None]] = []
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    async def get_all(self, fetch: Callable[[], Awaitable[List[T]]]) -> List[T]:
+        """Get all items
+
+        Fresh and stale entries are returned immediately (stale ones start a
+        background refresh); without an entry the caller waits for the fetch.
+        """
+        entry = await self._cache.get(self._key)
+        if entry:
+            if time.time() - entry["fetched_at"] >= self._ttl.fresh:
+                self._start_refresh(fetch)
+            self._served_at = entry["fetched_at"]
+            return self._items(entry)
+
+        items = await asyncio.shield(self._start_refresh(fetch))
+        self._served_at = self._memo[0] if self._memo else None
+        return list(items)
+
+    async def find_by_id(
+        self, item_id: int, fetch: Callable[[], Awaitable[List[T]]]
+    ) -> Optional[T]:
+        """Find an item by ID, remembering IDs that were not found"""
+        entry = await self._cache.get(self._key)
+        if entry and await self._negative.get(
+            self._missing_key.format(item_id, entry["fetched_at"])
+        ):
+            logger.debug(f"{self._resource} {item_id} is cached as not found")
+            return None
+
+        items = await self.get_all(fetch)
+        item = next((i for i in items if i.id == item_id), None)
+        if item is None and self._served_at is not None:
+            await self._negative.record(
+                self._missing_key.format(item_id, self._served_at),
+                "not found",
+                self._ttl.negative,
+                self._ttl.negative_max,
+            )
+        return item
+
+    async def wait_for_refresh(self) -> bool:
+        """Wait for the in-flight refresh
+
+        Returns:
+            True if newer items than the last served ones are available
+        """
+        served_at = self._served_at
+        if self._refresh_task is not None:
+            try:
+                await asyncio.shield(self._refresh_task)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+
+        entry = await self._cache.get(self._key)
+        return bool(entry) and entry["fetched_at"] != served_at
+
+    def add_refresh_listener(self, listener: Callable[[], None]) -> None:
+        """Call listener after each successful refresh"""
+        self._refresh_listeners.append(listener)
+
+    async def clear(self) -> None:
+        """Clear cache, including the persisted snapshot"""
+        await self._cache.delete(self._key)
+        await self._negative.clear(self._key)
+        if self._snapshot_cache is not None:
+            await self._snapshot_cache.delete(self._key)
+        self._memo = None
+
+    async def restore_snapshot(self) -> bool:
+        """Load the persisted snapshot into the cache
+
+        The restored entry keeps its original fetch time, so it is served
+        right away and revalidated in the background on first use.
+
+        Returns:
+            True if a snapshot was restored
+        """
+        if self._snapshot_cache is None or await self._cache.get(self._key):
+            return False
+
+        entry = await self._snapshot_cache.get(self._key)
+        if not entry:
+            return False
+
+        await self._cache.set(self._key, entry, ttl=self._ttl.retention)
+        logger.info(f"Restored {len(entry['items'])} {self._resource} from snapshot")
+        return True
+
+    async def save_snapshot(self) -> None:
+        """Persist the current entry as snapshot"""
+        entry = await self._cache.get(self._key)
+        if entry:
+            await self._persist(entry)
+
+    def _start_refresh(self, fetch: Callable[[], Awaitable[List[T]]]) -> asyncio.Task:
+        """Start a refresh unless one is already running"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh(fetch))
+            self._refresh_task.add_done_callback(self._on_refresh_done)
+        return self._refresh_task
+
+    def _on_refresh_done(self, task: asyncio.Task) -> None:
+        if self._refresh_task is task:
+            self._refresh_task = None
+        if not task.cancelled() and task.exception():
+            # Retrieved here so background failures are not reported as
+            # "exception was never retrieved"
+            logger.debug(f"Refreshing {self._resource} failed: {task.exception()}")
+
+    async def _refresh(self, fetch: Callable[[], Awaitable[List[T]]]) -> List[T]:
+        """Fetch items and store them"""
+        await self._negative.raise_if_cached(self._key)
+
+        logger.info(f"Fetching {self._resource} from API")
+        try:
+            items = await fetch()
+        except Exception as e:
+            ttl = await self._negative.record(
+                self._key, str(e), self._ttl.negative, self._ttl.negative_max
+            )
+            logger.warning(f"Failed to fetch {self._resource}, retrying in {ttl}s: {e}")
+            raise
+        await self._negative.clear(self._key)
+
+        entry = {
+            "fetched_at": time.time(),
+            "items": [self._serialize(item) for item in items],
+        }
+        await self._cache.set(self._key, entry, ttl=self._ttl.retention)
+        self._memo = (entry["fetched_at"], items)
+        logger.info(f"Loaded {len(items)} {self._resource} from API")
+
+        await self._persist(entry)
+        for listener in self._refresh_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"{self._resource} refresh listener failed: {e}")
+        return items
+
+    async def _persist(self, entry: dict) -> None:
+        """Write an entry to the snapshot cache"""
+        if self._snapshot_cache is None:
+            return
+        try:
+            await self._snapshot_cache.set(self._key, entry, ttl=self._snapshot_ttl)
+        except Exception as e:
+            logger.error(f"Failed to save {self._resource} snapshot: {e}")
+
+    def _items(self, entry: dict) -> List[T]:
+        """Map a cached entry to domain objects, reusing the last mapping"""
+        if self._memo and self._memo[0] == entry["fetched_at"]:
+            return list(self._memo[1])
+
+        logger.info(f"Loading {len(entry['items'])} {self._resource} from cache")
+        items = [self._deserialize(data) for data in entry["items"]]
+        self._memo = (entry["fetched_at"], items)
+        return list(items)
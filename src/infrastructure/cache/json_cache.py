@@ -1,7 +1,10 @@
 """JSON cache manager"""
 
+import asyncio
 import json
+import os
 import aiofiles
+import aiofiles.os
 from pathlib import Path
 from typing import Optional, Any, Dict
 from datetime import datetime, timedelta
@@ -9,40 +12,79 @@ from .cache_manager import CacheManager
 
 
 class JsonCacheManager(CacheManager):
-    """JSON file-based cache manager"""
+    """JSON file-based cache manager
+
+    The file is loaded once, by a single in-flight load shared between all
+    callers. Saves are serialized by a lock and written to a temporary file
+    that is atomically renamed over the cache file.
+    """
 
     def __init__(self, cache_file: Path):
         self._cache_file = cache_file
         self._cache: Dict[str, dict] = {}
         self._loaded = False
+        self._load_task: Optional[asyncio.Future] = None
+        self._save_lock = asyncio.Lock()
+
+        # Bumped on every change so queued saves of an already written
+        # state can be skipped
+        self._version = 0
+        self._saved_version = 0
 
     async def _load(self) -> None:
         """Load cache file"""
         if self._loaded:
             return
 
-        if not self._cache_file.exists():
-            self._cache = {}
-            self._loaded = True
-            return
+        if self._load_task is None:
+            self._load_task = asyncio.ensure_future(self._read())
+
+        # Shielded so a cancelled caller does not cancel the shared load
+        await asyncio.shield(self._load_task)
 
+    async def _read(self) -> None:
+        """Read cache file"""
         try:
-            async with aiofiles.open(self._cache_file, "r", encoding="utf-8") as f:
-                content = await f.read()
+            if self._cache_file.exists():
+                async with aiofiles.open(
+                    self._cache_file, "r", encoding="utf-8"
+                ) as f:
+                    content = await f.read()
                 self._cache = json.loads(content)
-            self._loaded = True
+            else:
+                self._cache = {}
         except Exception:
             self._cache = {}
+        finally:
             self._loaded = True
 
     async def _save(self) -> None:
         """Save cache files"""
-        self._cache_file.parent.mkdir(parents=True, exist_ok=True)
-        try:
-            async with aiofiles.open(self._cache_file, "w", encoding="utf-8") as f:
-                await f.write(json.dumps(self._cache, indent=2, ensure_ascii=False))
-        except Exception:
-            pass
+        self._version += 1
+
+        async with self._save_lock:
+            if self._saved_version >= self._version:
+                # A save queued before us already wrote this state
+                return
+
+            version = self._version
+            content = json.dumps(self._cache, indent=2, ensure_ascii=False)
+            temp_file = self._cache_file.with_name(
+                f".{self._cache_file.name}.{os.getpid()}.tmp"
+            )
+
+            try:
+                self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+                async with aiofiles.open(temp_file, "w", encoding="utf-8") as f:
+                    await f.write(content)
+                    await f.flush()
+                await aiofiles.os.replace(temp_file, self._cache_file)
+                self._saved_version = version
+            except Exception:
+                try:
+                    await aiofiles.os.remove(temp_file)
+                except OSError:
+                    pass
 
     async def get(self, key: str) -> Optional[Any]:
         """Get cache"""
@@ -83,8 +125,10 @@ class JsonCacheManager(CacheManager):
 
     async def clear(self) -> None:
         """Clear all cache"""
+        # Let an in-flight load finish first so it cannot resurrect entries
+        await self._load()
+
         self._cache = {}
-        self._loaded = True
         await self._save()
 
     async def exists(self, key: str) -> bool:
@@ -0,0 +1,90 @@
+"""Negative cache"""
+
+import time
+from typing import Optional
+import logging
+from .cache_manager import CacheManager
+
+logger = logging.getLogger(__name__)
+
+
+class CachedFailureError(Exception):
+    """Raised while a recent failure is still negatively cached"""
+
+    def __init__(self, key: str, reason: str, retry_after: float):
+        self.key = key
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{reason} (retry in {max(retry_after, 0):.0f}s)")
+
+
+class NegativeCache:
+    """Failure and not-found cache
+
+    Entries live under their own key prefix so they never shadow positive
+    entries. Each consecutive failure of the same key doubles its TTL up to
+    ``max_ttl``; ``clear`` resets the streak after a success.
+    """
+
+    KEY_PREFIX = "negative:"
+
+    def __init__(
+        self,
+        cache_manager: CacheManager,
+        base_ttl: float = 5,
+        max_ttl: float = 300,
+    ):
+        self._cache = cache_manager
+        self._base_ttl = base_ttl
+        self._max_ttl = max_ttl
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Get the active negative entry for a key"""
+        entry = await self._cache.get(self.KEY_PREFIX + key)
+        if not entry or time.time() >= entry["retry_at"]:
+            return None
+        return entry
+
+    async def raise_if_cached(self, key: str) -> None:
+        """Raise CachedFailureError while a failure of the key is cached"""
+        entry = await self.get(key)
+        if entry:
+            raise CachedFailureError(
+                key, entry["reason"], entry["retry_at"] - time.time()
+            )
+
+    async def record(
+        self,
+        key: str,
+        reason: str = "",
+        base_ttl: Optional[float] = None,
+        max_ttl: Optional[float] = None,
+    ) -> float:
+        """Record a failure and return the negative TTL (seconds)
+
+        Args:
+            key: Cache key of the failed resource
+            reason: Failure description, re-raised by raise_if_cached
+            base_ttl: TTL of the first failure (defaults to the instance's)
+            max_ttl: TTL upper bound (defaults to the instance's)
+        """
+        base_ttl = self._base_ttl if base_ttl is None else base_ttl
+        max_ttl = self._max_ttl if max_ttl is None else max_ttl
+
+        previous = await self._cache.get(self.KEY_PREFIX + key)
+        failures = previous["failures"] + 1 if previous else 1
+        ttl = min(base_ttl * 2 ** (failures - 1), max_ttl)
+
+        # Keep the entry for twice its TTL so the failure streak survives
+        # until the next retry and keeps growing while failures continue
+        await self._cache.set(
+            self.KEY_PREFIX + key,
+            {"failures": failures, "reason": reason, "retry_at": time.time() + ttl},
+            ttl=int(ttl * 2) + 1,
+        )
+        logger.debug(f"Negative cache {key}: failures={failures}, ttl={ttl}s")
+        return ttl
+
+    async def clear(self, key: str) -> None:
+        """Clear the negative entry (and failure streak) of a key"""
+        await self._cache.delete(self.KEY_PREFIX + key)
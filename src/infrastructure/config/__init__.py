@@ -1,11 +1,14 @@
 """Infrastructure configuration"""
 
 from .settings import Settings, get_settings
+from .cache_policy import CachePolicy, ResourceTtl
 from .constants import APP_VERSION, APP_NAME, CACHE_TTL
 
 __all__ = [
     "Settings",
     "get_settings",
+    "CachePolicy",
+    "ResourceTtl",
     "APP_VERSION",
     "APP_NAME",
     "CACHE_TTL",
@@ -0,0 +1,79 @@
+"""Cache TTL policy"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .settings import Settings
+
+
+@dataclass(frozen=True)
+class ResourceTtl:
+    """TTL settings of a single resource type (seconds)
+
+    Attributes:
+        fresh: How long an entry is served without refreshing
+        max_stale: How long past ``fresh`` an entry may still be served
+            when refreshing is failing or in progress
+        negative: Initial TTL of a negative (failure / not found) entry
+        negative_max: Upper bound of the exponentially growing negative TTL
+    """
+
+    fresh: int
+    max_stale: int
+    negative: int
+    negative_max: int
+
+    @property
+    def retention(self) -> int:
+        """How long an entry is kept at all"""
+        return self.fresh + self.max_stale
+
+    @property
+    def fresh_delta(self) -> timedelta:
+        return timedelta(seconds=self.fresh)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Per-resource cache TTL policy"""
+
+    bots: ResourceTtl
+    servers: ResourceTtl
+    templates: ResourceTtl
+    comments: ResourceTtl
+    images: ResourceTtl
+
+    RESOURCES = ("bots", "servers", "templates", "comments", "images")
+
+    def for_resource(self, resource: str) -> ResourceTtl:
+        if resource not in self.RESOURCES:
+            raise KeyError(f"Unknown cache resource: {resource}")
+        return getattr(self, resource)
+
+    def fresh_ttls(self) -> Dict[str, timedelta]:
+        """Fresh TTLs of all resources as timedelta"""
+        return {
+            resource: self.for_resource(resource).fresh_delta
+            for resource in self.RESOURCES
+        }
+
+    @classmethod
+    def from_settings(cls, settings: "Settings") -> "CachePolicy":
+        """Build the policy from Settings
+
+        ``settings.cache_ttl`` is the default fresh TTL, overridden per
+        resource by ``settings.cache_ttls``.
+        """
+        ttls = {}
+        for resource in cls.RESOURCES:
+            values = {
+                "fresh": settings.cache_ttl,
+                "max_stale": settings.cache_max_stale,
+                "negative": settings.negative_cache_ttl,
+                "negative_max": settings.negative_cache_max_ttl,
+            }
+            values.update(settings.cache_ttls.get(resource, {}))
+            ttls[resource] = ResourceTtl(**values)
+        return cls(**ttls)
@@ -1,8 +1,8 @@
 """Application settings"""
 
 from pathlib import Path
-from typing import Optional
-from dataclasses import dataclass
+from typing import Optional, Dict
+from dataclasses import dataclass, field
 import platform
 import os
 import json
@@ -26,8 +26,38 @@ class Settings:
     api_base_url: str = "https://dctw.nyanko.host/api/v1"
     api_key: Optional[str] = None
     cache_ttl: int = 60
+    cache_max_stale: int = 3600
+    negative_cache_ttl: int = 5
+    negative_cache_max_ttl: int = 300
+    catalog_snapshot_ttl: int = 30 * 24 * 3600
+
+    # Per-resource overrides of the defaults above, see CachePolicy
+    cache_ttls: Dict[str, Dict[str, int]] = field(
+        default_factory=lambda: {
+            "servers": {"fresh": 300, "max_stale": 6 * 3600},
+            "templates": {"fresh": 3600, "max_stale": 24 * 3600, "negative": 10},
+            "comments": {"fresh": 120},
+            "images": {
+                "fresh": 7 * 24 * 3600,
+                "max_stale": 30 * 24 * 3600,
+                "negative": 30,
+                "negative_max": 3600,
+            },
+        }
+    )
 
     image_server_port_range: tuple[int, int] = (10000, 60000)
+    # Share one image server between app instances, see SharedImageServer
+    shared_image_server: bool = False
+    image_cache_max_bytes: int = 256 * 1024 * 1024
+    image_memory_cache_bytes: int = 16 * 1024 * 1024
+    image_memory_cache_item_bytes: int = 64 * 1024
+    image_inline_max_bytes: int = 4 * 1024
+    image_inline_memo_bytes: int = 2 * 1024 * 1024
+    image_warm_max_items: int = 500
+    image_warm_bytes_per_second: int = 512 * 1024
+    image_download_timeout: float = 15.0
+    image_max_connections_per_host: int = 6
 
     def __post_init__(self):
 
@@ -8,11 +8,25 @@ from domain.discovery.repositories import (
     TemplateRepository,
 )
 from domain.preferences.repositories import PreferencesRepository
-from ..config import get_settings
+from ..config import get_settings, CachePolicy
 from ..api import DctwApiClient
-from ..cache import CacheManager, MemoryCacheManager
+from ..cache import (
+    CacheManager,
+    JsonCacheManager,
+    MemoryCacheManager,
+    NegativeCache,
+)
 from ..filesystem import ConfigStorage
-from ..image import ImageServer
+from ..image import (
+    ImageServer,
+    CdnClient,
+    HotImageCache,
+    ImagePrefetcher,
+    DiscordEmojiRewriter,
+    ImageCacheWarmer,
+    ImageServerLock,
+    SharedImageServer,
+)
 from ..repositories import (
     DctwBotRepository,
     DctwServerRepository,
@@ -87,6 +101,13 @@ def get_container() -> DiContainer:
 def setup_container() -> DiContainer:
     container = DiContainer()
     settings = get_settings()
+    cache_policy = CachePolicy.from_settings(settings)
+
+    container.register(
+        CachePolicy,
+        lambda c: cache_policy,
+        singleton=True,
+    )
 
     container.register(
         CacheManager,
@@ -94,11 +115,69 @@ def setup_container() -> DiContainer:
         singleton=True,
     )
 
+    container.register(
+        JsonCacheManager,
+        lambda c: JsonCacheManager(settings.cache_file),
+        singleton=True,
+    )
+
+    container.register(
+        NegativeCache,
+        lambda c: NegativeCache(c.resolve(CacheManager)),
+        singleton=True,
+    )
+
     container.register(
         ImageServer,
         lambda c: ImageServer(
             cache_dir=settings.image_cache_dir,
             port_range=settings.image_server_port_range,
+            max_cache_bytes=settings.image_cache_max_bytes,
+            negative_cache=c.resolve(NegativeCache),
+            ttl=cache_policy.images,
+            cdn_client=CdnClient(
+                max_per_host=settings.image_max_connections_per_host,
+                timeout=settings.image_download_timeout,
+            ),
+            hot_cache=HotImageCache(
+                max_bytes=settings.image_memory_cache_bytes,
+                max_item_bytes=settings.image_memory_cache_item_bytes,
+            ),
+            inline_max_bytes=settings.image_inline_max_bytes,
+            inline_memo_bytes=settings.image_inline_memo_bytes,
+            # Opened by SharedImageServer once it owns the cache directory
+            load_cache=not settings.shared_image_server,
+        ),
+        singleton=True,
+    )
+
+    container.register(
+        ImagePrefetcher,
+        lambda c: ImagePrefetcher(c.resolve(ImageServer)),
+        singleton=False,
+    )
+
+    container.register(
+        DiscordEmojiRewriter,
+        lambda c: DiscordEmojiRewriter(c.resolve(ImageServer)),
+        singleton=True,
+    )
+
+    container.register(
+        ImageCacheWarmer,
+        lambda c: ImageCacheWarmer(
+            c.resolve(ImageServer),
+            bytes_per_second=settings.image_warm_bytes_per_second,
+            max_items=settings.image_warm_max_items,
+        ),
+        singleton=True,
+    )
+
+    container.register(
+        SharedImageServer,
+        lambda c: SharedImageServer(
+            c.resolve(ImageServer),
+            ImageServerLock(settings.data_dir / "image_server.lock"),
         ),
         singleton=True,
     )
@@ -124,6 +203,10 @@ def setup_container() -> DiContainer:
         lambda c: DctwBotRepository(
             api_client=c.resolve(DctwApiClient),
             cache_manager=c.resolve(CacheManager),
+            negative_cache=c.resolve(NegativeCache),
+            ttl=cache_policy.bots,
+            snapshot_cache=c.resolve(JsonCacheManager),
+            snapshot_ttl=settings.catalog_snapshot_ttl,
         ),
         singleton=False,
     )
@@ -133,6 +216,10 @@ def setup_container() -> DiContainer:
         lambda c: DctwServerRepository(
             api_client=c.resolve(DctwApiClient),
             cache_manager=c.resolve(CacheManager),
+            negative_cache=c.resolve(NegativeCache),
+            ttl=cache_policy.servers,
+            snapshot_cache=c.resolve(JsonCacheManager),
+            snapshot_ttl=settings.catalog_snapshot_ttl,
         ),
         singleton=False,
     )
@@ -142,6 +229,10 @@ def setup_container() -> DiContainer:
         lambda c: DctwTemplateRepository(
             api_client=c.resolve(DctwApiClient),
             cache_manager=c.resolve(CacheManager),
+            negative_cache=c.resolve(NegativeCache),
+            ttl=cache_policy.templates,
+            snapshot_cache=c.resolve(JsonCacheManager),
+            snapshot_ttl=settings.catalog_snapshot_ttl,
         ),
         singleton=False,
     )
@@ -158,6 +249,7 @@ def setup_container() -> DiContainer:
             bot_repo=c.resolve(BotRepository),
             server_repo=c.resolve(ServerRepository),
             template_repo=c.resolve(TemplateRepository),
+            cache_ttls=cache_policy.fresh_ttls(),
         ),
         singleton=True,
     )
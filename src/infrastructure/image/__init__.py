@@ -2,8 +2,25 @@
 
 from .image_server import ImageServer
 from .image_cache import ImageCache
+from .cdn_client import CdnClient
+from .download_scheduler import DownloadScheduler, Priority
+from .hot_cache import HotImageCache
+from .prefetcher import ImagePrefetcher
+from .discord_emoji import DiscordEmojiRewriter
+from .cache_warmer import ImageCacheWarmer
+from .server_lock import ImageServerLock
+from .shared_server import SharedImageServer
 
 __all__ = [
     "ImageServer",
     "ImageCache",
+    "CdnClient",
+    "DownloadScheduler",
+    "Priority",
+    "HotImageCache",
+    "ImagePrefetcher",
+    "DiscordEmojiRewriter",
+    "ImageCacheWarmer",
+    "ImageServerLock",
+    "SharedImageServer",
 ]
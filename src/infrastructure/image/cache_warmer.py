@@ -0,0 +1,102 @@
+"""Background image cache warmer"""
+
+import asyncio
+import logging
+from typing import List, Optional, Sequence, Set, Tuple
+from .image_server import ImageServer
+from .download_scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+# (url, thumbnail width)
+WarmJob = Tuple[str, Optional[int]]
+
+
+class ImageCacheWarmer:
+    """Caches catalog images in the background while the app is idle
+
+    Jobs are processed in the given order (most popular first). Each one
+    waits until the image server has seen no UI activity for
+    ``idle_delay`` seconds, downloads are throttled to ``bytes_per_second``
+    across ``max_concurrency`` workers, and warming stops once the disk
+    cache is ``max_cache_fill`` full so it never evicts viewed images.
+    """
+
+    def __init__(
+        self,
+        image_server: ImageServer,
+        max_concurrency: int = 2,
+        bytes_per_second: int = 512 * 1024,
+        idle_delay: float = 3.0,
+        max_items: int = 500,
+        max_cache_fill: float = 0.8,
+    ):
+        self._server = image_server
+        self._max_concurrency = max_concurrency
+        self._bytes_per_second = bytes_per_second
+        self._idle_delay = idle_delay
+        self._max_items = max_items
+        self._max_cache_fill = max_cache_fill
+
+        self._jobs: List[WarmJob] = []
+        self._next = 0
+        self._workers: Set[asyncio.Task] = set()
+        # Loop time at which the bandwidth budget allows the next download
+        self._available_at = 0.0
+
+    def start(self, jobs: Sequence[WarmJob]) -> None:
+        """Warm a new set of images, replacing the current one"""
+        self.cancel()
+        if self._server.is_remote:
+            # Warmed by the instance that owns the shared image server
+            return
+        self._jobs = list(dict.fromkeys(job for job in jobs if job[0]))
+        self._jobs = self._jobs[: self._max_items]
+        for _ in range(min(self._max_concurrency, len(self._jobs))):
+            task = asyncio.create_task(self._work())
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+
+        logger.info(f"Warming up to {len(self._jobs)} images in the background")
+
+    def cancel(self) -> None:
+        """Stop warming"""
+        for task in self._workers:
+            task.cancel()
+        self._workers.clear()
+        self._jobs = []
+        self._next = 0
+
+    async def _work(self) -> None:
+        while self._next < len(self._jobs):
+            url, width = self._jobs[self._next]
+            self._next += 1
+            if self._server.is_cached(url, width):
+                continue
+
+            usage = self._server.cache.usage()
+            if usage["bytes"] >= usage["max_bytes"] * self._max_cache_fill:
+                logger.info("Image cache is nearly full, stopped warming")
+                self._next = len(self._jobs)
+                return
+
+            await self._server.wait_until_idle(self._idle_delay)
+            try:
+                await self._server.prefetch(url, width, priority=Priority.BACKGROUND)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Failed to warm {url}: {e}")
+                continue
+
+            await self._throttle(self._server.cached_size(url, width) or 0)
+
+    async def _throttle(self, size: int) -> None:
+        """Wait until the bandwidth budget covers a download of size bytes"""
+        now = asyncio.get_running_loop().time()
+        self._available_at = max(self._available_at, now) + (
+            size / self._bytes_per_second
+        )
+        delay = self._available_at - now
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,143 @@
+"""CDN HTTP client"""
+
+import asyncio
+import importlib.util
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import aiofiles
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass(frozen=True)
+class CdnResponse:
+    """Outcome of a download
+
+    Attributes:
+        size: Number of bytes written (0 if not modified)
+        etag: ETag validator sent by the origin
+        last_modified: Last-Modified validator sent by the origin
+        not_modified: The origin answered a conditional request with 304
+            and nothing was written
+    """
+
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False
+
+
+class CdnClient:
+    """Long-lived pooled HTTP client for image downloads
+
+    Connections are kept alive and reused across downloads (multiplexed
+    over HTTP/2 when available), the number of concurrent requests per host
+    is capped, and every download has an overall time budget. Bodies are
+    streamed to disk in chunks rather than buffered in memory.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        max_connections: int = 32,
+        max_per_host: int = 6,
+        timeout: float = 15.0,
+        connect_timeout: float = 5.0,
+        keepalive_expiry: float = 60.0,
+        http2: bool = True,
+    ):
+        self._max_connections = max_connections
+        self._max_per_host = max_per_host
+        self._timeout = timeout
+        self._connect_timeout = connect_timeout
+        self._keepalive_expiry = keepalive_expiry
+        self._http2 = http2 and HTTP2_AVAILABLE
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def http2(self) -> bool:
+        return self._http2
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout
+
+    async def download_to(
+        self,
+        url: str,
+        path: Path,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CdnResponse:
+        """Stream a file to disk within the timeout budget
+
+        With validators of a cached copy the request is conditional, and
+        nothing is written if the origin reports it as not modified.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        async with self._host_limit(url):
+            return await asyncio.wait_for(
+                self._stream(url, path, headers), self._timeout
+            )
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _stream(
+        self, url: str, path: Path, headers: Dict[str, str]
+    ) -> CdnResponse:
+        logger.debug(f"Download {url}")
+        size = 0
+        async with self._get_client().stream("GET", url, headers=headers) as response:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if response.status_code == 304 and headers:
+                return CdnResponse(0, etag, last_modified, not_modified=True)
+
+            response.raise_for_status()
+            async with aiofiles.open(path, "wb") as f:
+                async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                    await f.write(chunk)
+                    size += len(chunk)
+        return CdnResponse(size, etag, last_modified)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self._http2,
+                limits=httpx.Limits(
+                    max_connections=self._max_connections,
+                    max_keepalive_connections=self._max_connections,
+                    keepalive_expiry=self._keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self._timeout, connect=self._connect_timeout),
+                follow_redirects=True,
+            )
+            logger.info(f"CDN client started (HTTP/2: {self._http2})")
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        """Get the concurrency limit of the URL's host"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_per_host)
+            self._host_limits[host] = semaphore
+        return semaphore
@@ -0,0 +1,9 @@
+"""Data URIs of small cached images"""
+
+import base64
+
+
+def encode_data_uri(data: bytes, mimetype: str) -> str:
+    """Encode an image as a base64 data URI"""
+    return f"data:{mimetype};base64,{base64.b64encode(data).decode('ascii')}"
+
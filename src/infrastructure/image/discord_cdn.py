@@ -0,0 +1,74 @@
+"""Discord CDN URL normalization"""
+
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+CDN_HOST = "cdn.discordapp.com"
+_CDN_HOSTS = {CDN_HOST, "media.discordapp.net"}
+
+# Path roots of CDN assets that accept ?size=
+_SIZED_ROOTS = {
+    "avatars",
+    "icons",
+    "banners",
+    "emojis",
+    "app-icons",
+    "splashes",
+    "discovery-splashes",
+    "role-icons",
+    "guilds",
+}
+
+# Sizes served by the CDN (powers of two)
+CDN_SIZES = tuple(2**n for n in range(4, 13))
+STATIC_FORMAT = "png"
+
+
+def cdn_size(width: int) -> int:
+    """Get the smallest CDN size at or above a rendered width"""
+    for size in CDN_SIZES:
+        if size >= width:
+            return size
+    return CDN_SIZES[-1]
+
+
+def normalize_cdn_url(
+    url: str, width: Optional[int] = None, animated: bool = False
+) -> str:
+    """Rewrite a Discord CDN asset URL to the variant a surface needs
+
+    The size is the smallest CDN size at or above ``width`` (or the URL's
+    own size rounded up), animated images are requested in a static format
+    unless ``animated``, and the host and query are canonical so that
+    equivalent URLs share one cache entry. Other URLs are returned as-is.
+
+    Args:
+        url: Remote image URL
+        width: Rendered width in pixels
+        animated: The surface plays animations
+    """
+    parts = urlsplit(url.strip())
+    if parts.netloc.lower() not in _CDN_HOSTS:
+        return url
+    if parts.path.lstrip("/").split("/", 1)[0] not in _SIZED_ROOTS:
+        # Attachments carry signed parameters, embed avatars have one size
+        return url
+
+    path = parts.path
+    stem, dot, ext = path.rpartition(".")
+    if dot and not animated and ext.lower() == "gif":
+        path = f"{stem}.{STATIC_FORMAT}"
+
+    query = dict(parse_qsl(parts.query))
+    params = {}
+    if width:
+        params["size"] = cdn_size(width)
+    elif query.get("size", "").isdigit():
+        params["size"] = cdn_size(int(query["size"]))
+    if animated and query.get("animated") == "true":
+        params["animated"] = "true"
+
+    normalized = f"https://{CDN_HOST}{path}"
+    if params:
+        normalized += f"?{urlencode(params)}"
+    return normalized
@@ -0,0 +1,76 @@
+"""Discord emoji rewriting"""
+
+import asyncio
+import logging
+import re
+from typing import Hashable, List, Optional, Set
+from .image_server import ImageServer
+
+logger = logging.getLogger(__name__)
+
+# <:name:id> and animated <a:name:id>
+EMOJI_PATTERN = re.compile(r"<(a?):(\w*):(\d+)>")
+EMOJI_SIZE = 32
+
+
+def emoji_url(emoji_id: str, animated: bool, size: int = EMOJI_SIZE) -> str:
+    """Get the CDN URL of a custom emoji"""
+    ext = "gif" if animated else "png"
+    return (
+        f"https://cdn.discordapp.com/emojis/{emoji_id}.{ext}"
+        f"?size={size}&quality=lossless"
+    )
+
+
+class DiscordEmojiRewriter:
+    """Rewrites Discord emoji tags in Markdown to locally cached images
+
+    Text is tokenized in a single pass, all emojis of a text are registered
+    with the image server in one batch, and their images are pre-warmed in
+    the background so the Markdown renders from the local cache. Emojis
+    already cached are inlined as data URIs.
+    """
+
+    def __init__(self, image_server: ImageServer):
+        self._server = image_server
+        self._prewarm_tasks: Set[asyncio.Task] = set()
+
+    def rewrite(self, text: str, owner: Optional[Hashable] = None) -> str:
+        """Replace emoji tags with Markdown images served by the image server
+
+        Args:
+            text: Markdown text
+            owner: Token to cancel the pre-warming with cancel_owner
+        """
+        if not text:
+            return ""
+
+        # [text, animated, name, id, text, animated, name, id, ..., text]
+        parts = EMOJI_PATTERN.split(text)
+        if len(parts) == 1:
+            return text
+
+        urls = [
+            emoji_url(emoji_id, bool(animated))
+            for animated, emoji_id in zip(parts[1::4], parts[3::4])
+        ]
+        local_urls = self._server.register_images(urls, animated=True, inline=True)
+        self._prewarm(list(local_urls), owner)
+
+        chunks = parts[0::4]
+        output = [chunks[0]]
+        for url, chunk in zip(urls, chunks[1:]):
+            output.append(f"![emoji]({local_urls[url]})")
+            output.append(chunk)
+        return "".join(output)
+
+    def _prewarm(self, urls: List[str], owner: Optional[Hashable]) -> None:
+        """Cache emoji images in the background"""
+        try:
+            task = asyncio.get_running_loop().create_task(
+                self._server.prewarm(urls, animated=True, owner=owner)
+            )
+        except RuntimeError:
+            return
+        self._prewarm_tasks.add(task)
+        task.add_done_callback(self._prewarm_tasks.discard)
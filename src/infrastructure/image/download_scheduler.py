@@ -0,0 +1,174 @@
+"""Image download scheduler"""
+
+import asyncio
+import logging
+from collections import deque
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Download priority classes, most urgent first"""
+
+    ON_SCREEN = 0
+    PREFETCH = 1
+    BACKGROUND = 2
+
+
+DEFAULT_LIMITS = {
+    Priority.ON_SCREEN: 6,
+    Priority.PREFETCH: 4,
+    Priority.BACKGROUND: 2,
+}
+
+
+class _Job:
+    def __init__(
+        self, key: str, factory: Callable[[], Awaitable[Any]], priority: Priority
+    ):
+        self.key = key
+        self.factory = factory
+        self.priority = priority
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+        self.slot: Optional[Priority] = None  # class whose slot the job runs in
+        self.waiters = 0
+
+
+class DownloadScheduler:
+    """Runs downloads by priority class
+
+    Each class runs at most its limit of jobs at once, and lower classes
+    only start while no more urgent job is queued. Concurrent requests for
+    the same key share one job, which takes the most urgent priority among
+    its waiters. A job runs only while someone waits for it: when every
+    waiter is cancelled (e.g. with ``cancel_owner`` after its page was
+    disposed) the job is dropped from the queue or cancelled.
+    """
+
+    def __init__(self, limits: Optional[Dict[Priority, int]] = None):
+        self._limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self._queues: Dict[Priority, Deque[_Job]] = {p: deque() for p in Priority}
+        self._running: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._jobs: Dict[str, _Job] = {}
+        # Owner token -> tasks waiting on its behalf
+        self._owned: Dict[Hashable, Set[asyncio.Task]] = {}
+
+    async def run(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        priority: Priority = Priority.ON_SCREEN,
+        owner: Optional[Hashable] = None,
+    ) -> Any:
+        """Run factory once per key when a slot of its class is free
+
+        Args:
+            key: Shared by requests for the same download
+            factory: Starts the download
+            priority: Class of this request
+            owner: Token whose cancel_owner cancels this request
+        """
+        job = self._jobs.get(key)
+        if job is None:
+            job = _Job(key, factory, priority)
+            self._jobs[key] = job
+            self._queues[priority].append(job)
+        elif priority < job.priority:
+            if job.task is None:
+                self._queues[job.priority].remove(job)
+                self._queues[priority].append(job)
+            job.priority = priority
+
+        task = asyncio.current_task() if owner is not None else None
+        if task is not None:
+            self._owned.setdefault(owner, set()).add(task)
+        job.waiters += 1
+        self._dispatch()
+        try:
+            # Shielded so one waiter leaving does not cancel the others
+            return await asyncio.shield(job.future)
+        finally:
+            job.waiters -= 1
+            if job.waiters == 0 and not job.future.done():
+                self._abandon(job)
+            if task is not None:
+                self._release_owner(owner, task)
+
+    def cancel_owner(self, owner: Hashable) -> int:
+        """Cancel all requests made on behalf of owner
+
+        Returns:
+            Number of cancelled requests
+        """
+        tasks = self._owned.pop(owner, set())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            logger.debug(f"Cancelled {len(tasks)} image downloads of {owner!r}")
+        return len(tasks)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Queued and running jobs per class"""
+        return {
+            p.name.lower(): {
+                "queued": len(self._queues[p]),
+                "running": self._running[p],
+            }
+            for p in Priority
+        }
+
+    def _dispatch(self) -> None:
+        """Start queued jobs, most urgent class first"""
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue and self._running[priority] < self._limits[priority]:
+                self._start(queue.popleft(), priority)
+            if queue:
+                # Less urgent classes wait until this one is drained
+                return
+
+    def _start(self, job: _Job, slot: Priority) -> None:
+        job.slot = slot
+        self._running[slot] += 1
+        job.task = asyncio.get_running_loop().create_task(self._execute(job))
+
+    async def _execute(self, job: _Job) -> None:
+        try:
+            result = await job.factory()
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            self._running[job.slot] -= 1
+            self._forget(job)
+            self._dispatch()
+
+    def _abandon(self, job: _Job) -> None:
+        """Drop a job nobody waits for anymore"""
+        # Later requests for the key start a new job instead of joining this
+        # cancelled one
+        self._forget(job)
+        if job.task is None:
+            self._queues[job.priority].remove(job)
+            job.future.cancel()
+        else:
+            job.task.cancel()
+
+    def _forget(self, job: _Job) -> None:
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+
+    def _release_owner(self, owner: Hashable, task: asyncio.Task) -> None:
+        tasks = self._owned.get(owner)
+        if tasks is None:
+            return
+        tasks.discard(task)
+        if not tasks:
+            del self._owned[owner]
@@ -0,0 +1,66 @@
+"""In-memory image cache"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+# Encoded image, or its data URI
+Entry = Union[bytes, str]
+
+
+class HotImageCache:
+    """Byte-budgeted LRU of small encoded images, in front of the disk cache
+
+    Entries are keyed by content hash (ETag), so an overwritten or evicted
+    file can never be served from a stale entry. Also memoizes the data
+    URIs of inlined images, see ImageServer.register_images.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        max_item_bytes: int = 64 * 1024,
+    ):
+        self._max_bytes = max_bytes
+        self._max_item_bytes = max_item_bytes
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def accepts(self, size: Optional[int]) -> bool:
+        """Whether an image of this size is kept in memory"""
+        return size is not None and 0 < size <= self._max_item_bytes
+
+    def get(self, etag: str) -> Optional[Entry]:
+        data = self._entries.get(etag)
+        if data is None:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        self._entries.move_to_end(etag)
+        return data
+
+    def put(self, etag: str, data: Entry) -> None:
+        if not self.accepts(len(data)) or etag in self._entries:
+            return
+
+        self._entries[etag] = data
+        self._total_bytes += len(data)
+        while self._total_bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Current usage and hit statistics"""
+        return {
+            "bytes": self._total_bytes,
+            "max_bytes": self._max_bytes,
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+        }
@@ -1,56 +1,644 @@
 """Image cache"""
 
+import asyncio
 import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, Optional, Dict, List, Set, Tuple
 import logging
+from .image_index import ImageIndex
+from .cdn_client import CdnResponse
 
 logger = logging.getLogger(__name__)
 
+# Cache file names (MD5 hex digests)
+_KEY_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# Leading bytes of the image formats served by the CDNs
+_MAGIC_NUMBERS = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Detect the image type from the first bytes of a file"""
+    for magic, content_type in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
 
 class ImageCache:
-    """Image Cache Manager"""
+    """Size-bounded, content-addressed image disk cache"""
 
-    def __init__(self, cache_dir: Path):
+    INDEX_FILE = "index.db"
+    LEGACY_INDEX_FILE = "index.json"
+    INDEX_SAVE_DELAY = 2.0  # seconds
+    EVICT_TARGET = 0.9
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = 256 * 1024 * 1024,
+        load: bool = True,
+    ):
         self._cache_dir = cache_dir
         self._cache_dir.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+
+        # key -> {"url", "blob", "size", "content_type", "etag", "last_access",
+        # "origin_etag", "last_modified", "fetched_at", "placeholder"},
+        # least recently used first
+        self._index: "OrderedDict[str, dict]" = OrderedDict()
+        # blob -> {"size", "refs"}, refs counts the entries pointing at it
+        self._blobs: Dict[str, dict] = {}
+        self._total_bytes = 0  # size of all blobs
+        # Changes not yet written to the persistent index
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self._index_save_handle: Optional[asyncio.TimerHandle] = None
+        self._evict_task: Optional[asyncio.Task] = None
+
+        self._db: Optional[ImageIndex] = None
+        # Deferred by instances attached to a shared image server, see open()
+        if load:
+            self.open()
 
-    def get_cache_path(self, url: str) -> Path:
-        """Get cache file path by URL"""
-        url_hash = hashlib.md5(url.encode()).hexdigest()
-        return self._cache_dir / url_hash
+    @property
+    def is_open(self) -> bool:
+        return self._db is not None
+
+    def open(self) -> None:
+        """Load the index and tidy up the directory (temp files, eviction)"""
+        if self._db is not None:
+            return
+        self._db = ImageIndex(self._cache_dir / self.INDEX_FILE)
+        self._load_index()
+
+    @staticmethod
+    def cache_key(url: str) -> str:
+        """Get cache key by URL"""
+        return hashlib.md5(url.encode()).hexdigest()
 
     def exists(self, url: str) -> bool:
         """Check if the image is cached."""
-        cache_path = self.get_cache_path(url)
-        return cache_path.exists()
+        return self.cache_key(url) in self._index
+
+    def url_for_key(self, key: str) -> Optional[str]:
+        """Get the URL of a cached entry by its cache key"""
+        entry = self._index.get(key)
+        return entry["url"] if entry else None
+
+    def content_type(self, url: str) -> Optional[str]:
+        """Get the content type of a cached image"""
+        entry = self._index.get(self.cache_key(url))
+        return entry.get("content_type") if entry else None
+
+    def size(self, url: str) -> Optional[int]:
+        """Get the size of a cached image"""
+        entry = self._index.get(self.cache_key(url))
+        return entry["size"] if entry else None
+
+    def age(self, url: str) -> Optional[float]:
+        """Seconds since a cached image was fetched or last revalidated"""
+        entry = self._index.get(self.cache_key(url))
+        if entry is None:
+            return None
+        # Entries cached before fetch times were recorded count as stale
+        return time.time() - (entry.get("fetched_at") or 0)
+
+    def validators(self, url: str) -> Dict[str, Optional[str]]:
+        """Get the origin's validators of a cached image for a conditional GET"""
+        entry = self._index.get(self.cache_key(url)) or {}
+        return {
+            "etag": entry.get("origin_etag"),
+            "last_modified": entry.get("last_modified"),
+        }
+
+    def placeholder(self, url: str) -> Optional[str]:
+        """Get the placeholder colour of a cached image"""
+        entry = self._index.get(self.cache_key(url))
+        return entry.get("placeholder") if entry else None
+
+    def set_placeholder(self, url: str, color: str) -> None:
+        """Record the placeholder colour of a cached image"""
+        key = self.cache_key(url)
+        entry = self._index.get(key)
+        if entry is None or entry.get("placeholder") == color:
+            return
+        entry["placeholder"] = color
+        self._mark_dirty(key)
+
+    def file_size(self, path: Path) -> Optional[int]:
+        """Get the size of a cache file from the index"""
+        blob = self._blobs.get(path.name)
+        return blob["size"] if blob else None
+
+    def lookup(self, url: str) -> Optional[Path]:
+        """Get the cache file path of a cached image and mark it as used"""
+        key = self.cache_key(url)
+        if key not in self._index:
+            return None
 
-    def save(self, url: str, data: bytes) -> Path:
+        self._touch(key)
+        return self._path_for_key(self._index[key]["blob"])
+
+    def discard_file(self, path: Path) -> None:
+        """Forget the entries of a cache file that disappeared"""
+        self._drop_entries(
+            [key for key, entry in self._index.items() if entry["blob"] == path.name]
+        )
+
+    def remove(self, url: str) -> None:
+        """Forget a cached image, deleting its file unless shared"""
+        self._schedule_unlink(self._drop_entries([self.cache_key(url)]))
+
+    def discard_variants(self, url: str) -> None:
+        """Forget images derived from an image (``<url>#...`` keys)"""
+        prefix = f"{url}#"
+        keys = [
+            key
+            for key, entry in self._index.items()
+            if (entry.get("url") or "").startswith(prefix)
+        ]
+        self._schedule_unlink(self._drop_entries(keys))
+
+    async def save(self, url: str, data: bytes) -> Path:
         """Save image to cache"""
-        cache_path = self.get_cache_path(url)
+
+        async def write(path: Path) -> None:
+            await asyncio.to_thread(path.write_bytes, data)
+
+        return await self.save_download(url, write)
+
+    async def save_download(
+        self,
+        url: str,
+        download: Callable[[Path], Awaitable[Optional[CdnResponse]]],
+    ) -> Optional[Path]:
+        """Save an image streamed to disk by ``download(temp_path)``
+
+        The file is written to a temp path and moved into the blob store
+        once complete; the temp file is removed if the download fails. If
+        the download reports the cached copy as not modified, only its
+        fetch time is renewed.
+
+        Returns:
+            Cache file path, or None if the image is no longer cached
+        """
+        temp_path = self._temp_path()
         try:
-            cache_path.write_bytes(data)
-            logger.debug(f"Saved image to cache: {cache_path}")
-            return cache_path
-        except Exception as e:
-            logger.error(f"Failed to save image: {e}")
+            response = await download(temp_path)
+            if response is not None and response.not_modified:
+                self._discard(temp_path)
+                return self._renew(url, response)
+
+            blob, size, content_type = await asyncio.to_thread(
+                self._commit, temp_path
+            )
+        except BaseException as e:
+            self._discard(temp_path)
+            if isinstance(e, Exception):
+                logger.error(f"Failed to save image: {e}")
             raise
 
-    def load(self, url: str) -> Optional[bytes]:
+        cache_path = self._path_for_key(blob)
+        logger.debug(f"Saved image to cache: {cache_path}")
+        self._add_entry(url, blob, size, content_type, response)
+        return cache_path
+
+    def etag_for_key(self, key: str) -> Optional[str]:
+        """Get the content hash of a cached entry, if already known"""
+        entry = self._index.get(key)
+        return entry.get("etag") if entry else None
+
+    async def etag(self, url: str) -> Optional[str]:
+        """Get the content hash of a cached image"""
+        key = self.cache_key(url)
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+
+        if not entry.get("etag"):
+            # Entries of the URL-keyed layout are hashed once on demand
+            try:
+                etag, content_type = await asyncio.to_thread(
+                    self._hash_file, self._path_for_key(entry["blob"])
+                )
+            except OSError as e:
+                logger.error(f"Failed to hash image: {e}")
+                return None
+            entry["etag"] = etag
+            entry["content_type"] = entry.get("content_type") or content_type
+            self._mark_dirty(key)
+        return entry["etag"]
+
+    async def load(self, url: str) -> Optional[bytes]:
         """Load images from cache"""
-        cache_path = self.get_cache_path(url)
-        if not cache_path.exists():
+        cache_path = self.lookup(url)
+        if cache_path is None:
             return None
         try:
-            return cache_path.read_bytes()
+            return await asyncio.to_thread(cache_path.read_bytes)
         except Exception as e:
             logger.error(f"Failed to load image: {e}")
+            self._remove_entries([self.cache_key(url)])
             return None
 
-    def clear(self) -> None:
+    def usage(self) -> Dict[str, int]:
+        """Current cache usage"""
+        return {
+            "bytes": self._total_bytes,
+            "max_bytes": self._max_bytes,
+            "entries": len(self._index),
+            "files": len(self._blobs),
+        }
+
+    async def clear(self) -> None:
         """Clear all cached images"""
-        for file in self._cache_dir.glob("*"):
+        if self._db is None:
+            return
+        self._index.clear()
+        self._blobs.clear()
+        self._total_bytes = 0
+        self._dirty.clear()
+        self._deleted.clear()
+        await asyncio.to_thread(self._delete_all)
+
+    def flush(self) -> None:
+        """Write pending index changes"""
+        if self._index_save_handle is not None:
+            self._index_save_handle.cancel()
+            self._index_save_handle = None
+        self._write_index(*self._take_changes())
+
+    def _path_for_key(self, key: str) -> Path:
+        """Get the sharded file path of a blob"""
+        return self._cache_dir / key[:2] / key[2:4] / key
+
+    def _temp_path(self) -> Path:
+        """Get a unique temp file path in the cache directory"""
+        return self._cache_dir / f".{uuid.uuid4().hex}.tmp"
+
+    def _commit(self, temp_path: Path) -> Tuple[str, int, Optional[str]]:
+        """Move a complete temp file into the blob store
+
+        The file is renamed into place, so readers never see a partially
+        written blob. If the blob is already stored the temp file is dropped.
+
+        Returns:
+            (blob, size, content type)
+        """
+        size = temp_path.stat().st_size
+        blob, content_type = self._hash_file(temp_path)
+        path = self._path_for_key(blob)
+        if path.exists():
+            self._discard(temp_path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, path)
+        return blob, size, content_type
+
+    @staticmethod
+    def _hash_file(path: Path) -> Tuple[str, Optional[str]]:
+        """Get the content hash and content type of a file"""
+        digest = hashlib.blake2b(digest_size=12)
+        with open(path, "rb") as f:
+            head = f.read(64 * 1024)
+            digest.update(head)
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest(), sniff_content_type(head)
+
+    @staticmethod
+    def _discard(temp_path: Path) -> None:
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
+
+    def _delete_all(self) -> None:
+        """Delete every cached file
+
+        Shard directories are first renamed into a trash directory, which
+        is cheap regardless of how many files they hold, then removed.
+        """
+        self._db.clear()
+        trash = self._cache_dir / f".trash-{uuid.uuid4().hex}"
+        trash.mkdir()
+        for shard in self._cache_dir.iterdir():
+            if shard.is_dir() and not shard.name.startswith("."):
+                try:
+                    os.replace(shard, trash / shard.name)
+                except OSError as e:
+                    logger.error(f"Failed to delete {shard}: {e}")
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def _add_entry(
+        self,
+        url: str,
+        blob: str,
+        size: int,
+        content_type: Optional[str],
+        response: Optional[CdnResponse] = None,
+    ) -> None:
+        """Index a newly saved image as most recently used"""
+        key = self.cache_key(url)
+        self._add_ref(blob, size)
+        previous = self._index.pop(key, None)
+        now = time.time()
+        self._index[key] = {
+            "url": url,
+            "blob": blob,
+            "size": size,
+            "content_type": content_type,
+            "etag": blob,
+            "last_access": now,
+            "origin_etag": response.etag if response else None,
+            "last_modified": response.last_modified if response else None,
+            "fetched_at": now,
+            "placeholder": None,
+        }
+        self._mark_dirty(key)
+
+        if previous:
+            freed = self._release_ref(previous["blob"])
+            if freed:
+                self._schedule_unlink([freed])
+        if self._total_bytes > self._max_bytes:
+            self._schedule_eviction()
+
+    def _renew(self, url: str, response: CdnResponse) -> Optional[Path]:
+        """Mark a cached image as revalidated by the origin"""
+        key = self.cache_key(url)
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+
+        entry["fetched_at"] = time.time()
+        entry["origin_etag"] = response.etag or entry.get("origin_etag")
+        entry["last_modified"] = response.last_modified or entry.get("last_modified")
+        self._mark_dirty(key)
+        return self._path_for_key(entry["blob"])
+
+    def _add_ref(self, blob: str, size: int) -> None:
+        """Count an entry referencing a blob"""
+        stored = self._blobs.get(blob)
+        if stored is None:
+            self._blobs[blob] = {"size": size, "refs": 1}
+            self._total_bytes += size
+        else:
+            stored["refs"] += 1
+
+    def _release_ref(self, blob: str) -> Optional[str]:
+        """Drop a reference to a blob
+
+        Returns:
+            The blob if it is no longer referenced and its file can go
+        """
+        stored = self._blobs.get(blob)
+        if stored is None:
+            return None
+        stored["refs"] -= 1
+        if stored["refs"] > 0:
+            return None
+
+        del self._blobs[blob]
+        self._total_bytes -= stored["size"]
+        return blob
+
+    def _touch(self, key: str) -> None:
+        """Mark an entry as most recently used"""
+        self._index[key]["last_access"] = time.time()
+        self._index.move_to_end(key)
+        self._mark_dirty(key)
+
+    def _schedule_eviction(self) -> None:
+        """Evict least recently used entries in the background"""
+        if self._evict_task is not None and not self._evict_task.done():
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._remove_entries(self._select_victims())
+            return
+
+        self._evict_task = loop.create_task(self._evict())
+
+    async def _evict(self) -> None:
+        victims = self._select_victims()
+        freed = self._drop_entries(victims)
+        if not victims:
+            return
+
+        await asyncio.to_thread(self._unlink_files, freed)
+        logger.info(f"Evicted {len(victims)} images ({len(freed)} files) from cache")
+
+    def _select_victims(self) -> List[str]:
+        """Pick least recently used entries until usage fits the target
+
+        Only blobs losing their last reference free space.
+        """
+        target = self._max_bytes * self.EVICT_TARGET
+        excess = self._total_bytes - target
+        released: Dict[str, int] = {}
+        victims = []
+        for key, entry in self._index.items():
+            if excess <= 0:
+                break
+            victims.append(key)
+            blob = entry["blob"]
+            released[blob] = released.get(blob, 0) + 1
+            stored = self._blobs.get(blob)
+            if stored and released[blob] == stored["refs"]:
+                excess -= stored["size"]
+        return victims
+
+    def _remove_entries(self, keys: List[str]) -> None:
+        """Delete entries and their unreferenced files"""
+        self._unlink_files(self._drop_entries(keys))
+
+    def _drop_entries(self, keys: List[str]) -> List[str]:
+        """Remove entries from the index
+
+        Returns:
+            Blobs no longer referenced, whose files can be deleted
+        """
+        dropped = []
+        freed = []
+        for key in keys:
+            entry = self._index.pop(key, None)
+            if entry is not None:
+                dropped.append(key)
+                blob = self._release_ref(entry["blob"])
+                if blob:
+                    freed.append(blob)
+
+        if dropped:
+            self._dirty.difference_update(dropped)
+            self._deleted.update(dropped)
+            self._schedule_index_save()
+        return freed
+
+    def _schedule_unlink(self, blobs: List[str]) -> None:
+        """Delete unreferenced blob files in a worker thread"""
+        if not blobs:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._unlink_files(blobs)
+            return
+        loop.run_in_executor(None, self._unlink_files, blobs)
+
+    def _unlink_files(self, blobs: List[str]) -> None:
+        """Delete files of unreferenced blobs (may run in a worker thread)"""
+        for blob in blobs:
+            if blob in self._blobs:
+                # Referenced again since it was freed
+                continue
             try:
-                file.unlink()
+                self._path_for_key(blob).unlink()
+            except FileNotFoundError:
+                pass
             except Exception as e:
-                logger.error(f"Failed to delete {file}: {e}")
+                logger.error(f"Failed to delete {blob}: {e}")
+
+    def _load_index(self) -> None:
+        """Load the index, migrating a flat (unsharded) cache directory"""
+        try:
+            entries = self._db.load()
+        except Exception as e:
+            logger.error(f"Failed to load image cache index: {e}")
+            entries = []
+
+        migrated = self._migrate_flat_layout()
+        if migrated:
+            known = {key for key, _ in entries}
+            entries.extend(
+                (key, entry) for key, entry in migrated.items() if key not in known
+            )
+            entries.sort(key=lambda item: item[1]["last_access"])
+            self._dirty.update(migrated)
+
+        for key, entry in entries:
+            # Files of the URL-keyed layout are their own blob
+            entry["blob"] = entry.get("blob") or key
+            self._index[key] = entry
+            self._add_ref(entry["blob"], entry["size"])
+
+        if self._dirty:
+            self.flush()
+        if self._total_bytes > self._max_bytes:
+            self._remove_entries(self._select_victims())
+
+    def _migrate_flat_layout(self) -> Dict[str, dict]:
+        """Move files of the old flat layout into shard directories
+
+        Returns:
+            Index entries of the moved files
+        """
+        legacy_index_file = self._cache_dir / self.LEGACY_INDEX_FILE
+        legacy_index: Dict[str, dict] = {}
+        if legacy_index_file.exists():
+            try:
+                legacy_index = json.loads(
+                    legacy_index_file.read_text(encoding="utf-8")
+                )
+            except Exception as e:
+                logger.error(f"Failed to load legacy image cache index: {e}")
+
+        migrated: Dict[str, dict] = {}
+        for file in self._cache_dir.iterdir():
+            if not file.is_file():
+                continue
+            if file.name.startswith(".") and file.suffix == ".tmp":
+                # Left behind by an interrupted write
+                self._discard(file)
+                continue
+            if not _KEY_PATTERN.fullmatch(file.name):
+                continue
+
+            stat = file.stat()
+            entry = legacy_index.get(file.name) or {}
+            try:
+                path = self._path_for_key(file.name)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(file, path)
+            except OSError as e:
+                logger.error(f"Failed to migrate {file}: {e}")
+                continue
+
+            migrated[file.name] = {
+                "url": entry.get("url"),
+                "blob": file.name,
+                "size": stat.st_size,
+                "content_type": None,
+                "etag": entry.get("etag"),
+                "last_access": entry.get("last_access", stat.st_mtime),
+            }
+
+        if legacy_index_file.exists():
+            self._discard(legacy_index_file)
+        if migrated:
+            logger.info(f"Migrated {len(migrated)} images to the sharded layout")
+        return migrated
+
+    def _mark_dirty(self, key: str) -> None:
+        self._dirty.add(key)
+        self._deleted.discard(key)
+        self._schedule_index_save()
+
+    def _schedule_index_save(self) -> None:
+        """Save the index shortly, batching frequent changes"""
+        if self._index_save_handle is not None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+
+        self._index_save_handle = loop.call_later(
+            self.INDEX_SAVE_DELAY, self._save_index
+        )
+
+    def _save_index(self) -> None:
+        """Write pending index changes in a worker thread"""
+        self._index_save_handle = None
+        upserts, deletes = self._take_changes()
+        if upserts or deletes:
+            asyncio.get_running_loop().run_in_executor(
+                None, self._write_index, upserts, deletes
+            )
+
+    def _take_changes(self) -> Tuple[Dict[str, dict], List[str]]:
+        """Snapshot and reset the pending index changes"""
+        upserts = {
+            key: dict(self._index[key]) for key in self._dirty if key in self._index
+        }
+        deletes = list(self._deleted)
+        self._dirty.clear()
+        self._deleted.clear()
+        return upserts, deletes
+
+    def _write_index(self, upserts: Dict[str, dict], deletes: List[str]) -> None:
+        if self._db is None or (not upserts and not deletes):
+            return
+        try:
+            self._db.write(upserts, deletes)
+        except Exception as e:
+            logger.error(f"Failed to save image cache index: {e}")
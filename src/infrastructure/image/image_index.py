@@ -0,0 +1,105 @@
+"""Image cache index"""
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    "url",
+    "blob",
+    "size",
+    "content_type",
+    "etag",
+    "last_access",
+    "origin_etag",
+    "last_modified",
+    "fetched_at",
+    "placeholder",
+)
+# Columns missing from indexes created by older versions
+ADDED_COLUMNS = {
+    "blob": "TEXT",
+    "origin_etag": "TEXT",
+    "last_modified": "TEXT",
+    "fetched_at": "REAL",
+    "placeholder": "TEXT",
+}
+
+
+class ImageIndex:
+    """Persistent index of cached images (SQLite)
+
+    Holds one row per cached URL: URL, blob (content hash of the stored
+    file), size, content type, ETag, last access time, and the origin's
+    validators and fetch time for revalidation, and the placeholder colour
+    shown while the image loads. Writes are batched by the caller and may
+    run in a worker thread, so the connection is shared between threads
+    behind a lock.
+    """
+
+    def __init__(self, db_file: Path):
+        self._db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                " key TEXT PRIMARY KEY,"
+                " url TEXT,"
+                " blob TEXT,"
+                " size INTEGER NOT NULL,"
+                " content_type TEXT,"
+                " etag TEXT,"
+                " last_access REAL NOT NULL,"
+                " origin_etag TEXT,"
+                " last_modified TEXT,"
+                " fetched_at REAL,"
+                " placeholder TEXT)"
+            )
+            columns = {
+                row[1] for row in self._conn.execute("PRAGMA table_info(images)")
+            }
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in columns:
+                    self._conn.execute(
+                        f"ALTER TABLE images ADD COLUMN {column} {column_type}"
+                    )
+            self._conn.commit()
+
+    def load(self) -> List[Tuple[str, dict]]:
+        """Get all entries, least recently used first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, {', '.join(COLUMNS)} FROM images ORDER BY last_access"
+            ).fetchall()
+        return [(row[0], dict(zip(COLUMNS, row[1:]))) for row in rows]
+
+    def write(self, upserts: Dict[str, dict], deletes: Iterable[str]) -> None:
+        """Apply a batch of changes in one transaction"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM images WHERE key = ?", [(key,) for key in deletes]
+            )
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO images (key, {', '.join(COLUMNS)})"
+                f" VALUES (?, {', '.join('?' * len(COLUMNS))})",
+                [
+                    (key, *(entry.get(column) for column in COLUMNS))
+                    for key, entry in upserts.items()
+                ],
+            )
+
+    def clear(self) -> None:
+        """Delete all entries"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM images")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
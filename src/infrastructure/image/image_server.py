@@ -1,30 +1,118 @@
 """Image server"""
 
+import hashlib
+import hmac
+import os
 import random
+import secrets
+import socket
+import weakref
 import asyncio
 import logging
 from pathlib import Path
-from typing import Optional, Dict
-from quart import Quart, send_file, abort
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+import httpx
+from hypercorn.asyncio import serve
+from hypercorn.config import Config as HyperConfig
+from quart import Quart, Response, send_file, abort, request
+from quart.helpers import DEFAULT_MIMETYPE
 from .image_cache import ImageCache
-from ..api.http_client import AsyncHttpClient
+from .thumbnailer import Thumbnailer, THUMBNAIL_FORMATS
+from .cdn_client import CdnClient
+from .hot_cache import HotImageCache
+from .discord_cdn import normalize_cdn_url
+from .download_scheduler import DownloadScheduler, Priority
+from .data_uri import encode_data_uri
+from ..cache import NegativeCache, CachedFailureError
+from ..config import ResourceTtl
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class ImageServer:
     """Quart-based async image caching server"""
 
+    MAX_REGISTERED_IMAGES = 4096
+    IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+    LISTEN_BACKLOG = 128
+
     def __init__(
         self,
         cache_dir: Path,
+        negative_cache: NegativeCache,
+        ttl: ResourceTtl,
         port_range: tuple[int, int] = (10000, 60000),
+        max_cache_bytes: int = 256 * 1024 * 1024,
+        thumbnailer: Optional[Thumbnailer] = None,
+        cdn_client: Optional[CdnClient] = None,
+        hot_cache: Optional[HotImageCache] = None,
+        scheduler: Optional[DownloadScheduler] = None,
+        max_registered_images: int = MAX_REGISTERED_IMAGES,
+        inline_max_bytes: int = 4 * 1024,
+        inline_memo_bytes: int = 2 * 1024 * 1024,
+        load_cache: bool = True,
     ):
         self.app = Quart(__name__)
-        self.cache = ImageCache(cache_dir)
+        self.cache = ImageCache(cache_dir, max_bytes=max_cache_bytes, load=load_cache)
+        self.hot_cache = hot_cache or HotImageCache()
         self.port_range = port_range
+        self._negative = negative_cache
+        self._ttl = ttl
+        self._thumbnailer = thumbnailer or Thumbnailer()
+        self._cdn = cdn_client or CdnClient()
+        self._scheduler = scheduler or DownloadScheduler()
         self._port: Optional[int] = None
-        self._url_mapping: Dict[str, str] = {}  # id -> url
+        self._url_mapping: "OrderedDict[str, str]" = OrderedDict()  # id -> url
+        self._max_registered_images = max_registered_images
+        # Variant keys whose original is served as-is (animated, small, undecodable)
+        self._passthrough: Set[str] = set()
+        # Variant key -> in-flight thumbnail shared by all waiters
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Data URIs of small images by ETag, see register_images(inline=True)
+        self._data_uris = HotImageCache(
+            max_bytes=inline_memo_bytes, max_item_bytes=inline_memo_bytes
+        )
+        self._inline_max_bytes = inline_max_bytes
+        self._inline_tasks: Dict[Tuple[str, Optional[int]], asyncio.Task] = {}
+        # URL -> background computation of a placeholder colour
+        self._placeholder_tasks: Dict[str, asyncio.Task] = {}
+        # URL -> background revalidation of a stale cached image
+        self._revalidations: Dict[str, asyncio.Task] = {}
+        # Image requests from the UI in progress, prefetching waits for them
+        self._foreground_count = 0
+        self._foreground_idle = asyncio.Event()
+        self._foreground_idle.set()
+        self._last_activity = 0.0  # loop time of the last UI activity
+        # Set once the server accepts requests (or failed to start)
+        self._ready = asyncio.Event()
+        # Set by stop() to shut the server down
+        self._shutdown = asyncio.Event()
+        self._start_error: Optional[Exception] = None
+        # Shared server mode: URL signing secret, and the port of the other
+        # instance's server this one is attached to
+        self._secret: Optional[str] = None
+        self._remote_port: Optional[int] = None
+        self._loopback: Optional[httpx.AsyncClient] = None
+        # Owner (e.g. a page) -> token in its local URLs, see cancel_owner
+        self._owner_tokens: "weakref.WeakKeyDictionary[Any, str]" = (
+            weakref.WeakKeyDictionary()
+        )
         self._setup_routes()
 
     def _setup_routes(self):
@@ -32,65 +120,710 @@ class ImageServer:
 
         @self.app.route("/image/<image_id>")
         async def serve_image(image_id: str):
-            if image_id not in self._url_mapping:
-                abort(404)
+            with self._foreground_request():
+                try:
+                    return await self._serve_image(image_id)
+                except FileNotFoundError:
+                    # Deleted behind the index's back, cached again on retry
+                    return await self._serve_image(image_id)
 
-            url = self._url_mapping[image_id]
-
-            if self.cache.exists(url):
-                cache_path = self.cache.get_cache_path(url)
-                return await send_file(cache_path)
-
-            try:
-                async with AsyncHttpClient(base_url="") as client:
-                    data = await client.download(url)
-                    cache_path = self.cache.save(url, data)
-                    return await send_file(cache_path)
-            except Exception as e:
-                logger.error(f"Failed to download image {url}: {e}")
-                abort(500)
+        @self.app.before_serving
+        async def on_ready():
+            self._ready.set()
 
         @self.app.route("/health")
         async def health():
             return {"status": "ok", "port": self._port}
 
+    async def _serve_image(self, image_id: str) -> Response:
+        """Serve an image, or a thumbnail of it with ``?w=``"""
+        url = self._resolve_image_id(image_id) or self._resolve_signed(image_id)
+        if url is None:
+            abort(404)
+
+        cache_path = await self._get_original(url, request.args.get("owner"))
+        etag = await self.cache.etag(url)
+        # URLs carrying the content hash never change their response
+        immutable = etag is not None and request.args.get("v") == etag
+
+        width = request.args.get("w", type=int)
+        if width and width > 0 and self._thumbnailer.available:
+            thumbnail = await self._get_thumbnail(url, width, request.args.get("fmt"))
+            if thumbnail is not None:
+                thumbnail_path, mimetype, variant_etag = thumbnail
+                return await self._send(
+                    thumbnail_path, mimetype, variant_etag, immutable
+                )
+
+        return await self._send(
+            cache_path, self.cache.content_type(url), etag, immutable
+        )
+
+    async def _send(
+        self, path: Path, mimetype: Optional[str], etag: Optional[str], immutable: bool
+    ) -> Response:
+        """Send a cached file with validators, answering 304 and range requests"""
+        try:
+            data = await self._read_hot(path, etag)
+            if data is not None:
+                response = Response(data, mimetype=mimetype or DEFAULT_MIMETYPE)
+            else:
+                response = await send_file(path, mimetype=mimetype, add_etags=False)
+        except FileNotFoundError:
+            self.cache.discard_file(path)
+            raise
+        if etag:
+            response.set_etag(etag)
+
+        if immutable:
+            response.cache_control.max_age = self.IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            # Cheap to revalidate, the ETag turns repeat views into 304s
+            response.cache_control.max_age = None
+            response.cache_control.no_cache = True
+            response.expires = None
+
+        return await response.make_conditional(
+            request, accept_ranges=True, complete_length=response.content_length
+        )
+
+    async def _read_hot(self, path: Path, etag: Optional[str]) -> Optional[bytes]:
+        """Get a small image from memory, reading it into memory on a miss
+
+        Returns:
+            The image, or None if it is too large to keep in memory
+        """
+        if etag is None or not self.hot_cache.accepts(self.cache.file_size(path)):
+            return None
+
+        data = self.hot_cache.get(etag)
+        if data is None:
+            data = await asyncio.to_thread(path.read_bytes)
+            self.hot_cache.put(etag, data)
+        return data
+
+    async def fetch(
+        self,
+        url: str,
+        priority: Priority = Priority.ON_SCREEN,
+        owner: Optional[Hashable] = None,
+    ) -> Path:
+        """Get the cached original image, downloading it on a miss
+
+        Args:
+            url: Remote image URL
+            priority: Scheduling class of the download
+            owner: Token to cancel the download with cancel_owner
+
+        Raises:
+            CachedFailureError: The URL failed recently
+        """
+        cache_path = self.cache.lookup(url)
+        if cache_path is not None:
+            self._revalidate_if_stale(url)
+            return cache_path
+
+        return await self._scheduler.run(
+            url, lambda: self._download(url), priority, owner
+        )
+
+    async def prefetch(
+        self,
+        url: str,
+        width: Optional[int] = None,
+        animated: bool = False,
+        priority: Priority = Priority.PREFETCH,
+        owner: Optional[Hashable] = None,
+    ) -> None:
+        """Cache an image (and its thumbnail for ``width``) ahead of display"""
+        url = normalize_cdn_url(url, width, animated)
+        if self.is_remote:
+            await self._scheduler.run(
+                f"{url}#w={width}",
+                lambda: self._fetch_remote(url, width),
+                priority,
+                owner,
+            )
+            return
+
+        await self.fetch(url, priority, owner)
+        if width and self._thumbnailer.available:
+            await self._get_thumbnail(url, width, None)
+
+    def is_cached(
+        self, url: str, width: Optional[int] = None, animated: bool = False
+    ) -> bool:
+        """Whether prefetch already cached the image for ``width``"""
+        return self.cache.exists(normalize_cdn_url(url, width, animated))
+
+    def cached_size(
+        self, url: str, width: Optional[int] = None, animated: bool = False
+    ) -> Optional[int]:
+        """Size of the image prefetch cached for ``width``, None if not cached"""
+        return self.cache.size(normalize_cdn_url(url, width, animated))
+
+    async def prewarm(
+        self,
+        urls: Iterable[str],
+        width: Optional[int] = None,
+        animated: bool = False,
+        priority: Priority = Priority.PREFETCH,
+        owner: Optional[Hashable] = None,
+    ) -> int:
+        """Cache a batch of images concurrently
+
+        Returns:
+            Number of images now cached
+        """
+        results = await asyncio.gather(
+            *(
+                self.prefetch(url, width, animated, priority, owner)
+                for url in dict.fromkeys(urls)
+            ),
+            return_exceptions=True,
+        )
+        return sum(1 for result in results if not isinstance(result, BaseException))
+
+    async def _fetch_remote(self, url: str, width: Optional[int]) -> None:
+        """Have the shared server this instance is attached to cache an image"""
+        image_id = self.register_image(url)
+        if self._loopback is None:
+            self._loopback = httpx.AsyncClient(timeout=self._cdn.timeout)
+        async with self._loopback.stream(
+            "GET", self.get_image_url(image_id, width=width)
+        ) as response:
+            response.raise_for_status()
+            async for _ in response.aiter_raw():
+                pass
+
+    def cancel_owner(self, owner: Hashable) -> None:
+        """Cancel the downloads started on behalf of owner (e.g. a page)
+
+        This includes the image requests of local URLs registered for it.
+        """
+        self._scheduler.cancel_owner(owner)
+        token = self._owner_tokens.pop(owner, None)
+        if token is not None:
+            self._scheduler.cancel_owner(token)
+
+    def _owner_token(self, owner: Optional[Hashable]) -> Optional[str]:
+        """Get the token identifying owner in local URLs"""
+        if owner is None:
+            return None
+        token = self._owner_tokens.get(owner)
+        if token is None:
+            token = self._owner_tokens[owner] = secrets.token_hex(8)
+        return token
+
+    async def wait_for_foreground(self) -> None:
+        """Wait until no image requests from the UI are being served"""
+        await self._foreground_idle.wait()
+
+    async def wait_until_idle(self, idle_delay: float) -> None:
+        """Wait until there was no UI activity for idle_delay seconds"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._foreground_idle.wait()
+            remaining = self._last_activity + idle_delay - loop.time()
+            if remaining <= 0 and self._foreground_idle.is_set():
+                return
+            await asyncio.sleep(max(remaining, 0.1))
+
+    def mark_activity(self) -> None:
+        """Note UI activity, e.g. a page being loaded"""
+        self._last_activity = asyncio.get_running_loop().time()
+
+    @contextmanager
+    def _foreground_request(self):
+        """Track an image request from the UI"""
+        self._foreground_count += 1
+        self._foreground_idle.clear()
+        self.mark_activity()
+        try:
+            yield
+        finally:
+            self._foreground_count -= 1
+            if self._foreground_count == 0:
+                self._foreground_idle.set()
+            self.mark_activity()
+
+    async def _get_original(self, url: str, owner: Optional[str] = None) -> Path:
+        """Get the cached original image, aborting the request on failure"""
+        try:
+            return await self.fetch(url, owner=owner)
+        except CachedFailureError:
+            abort(404)
+        except Exception:
+            abort(500)
+
+    async def _download(self, url: str) -> Path:
+        """Download an image into the cache"""
+        await self._negative.raise_if_cached(url)
+
+        try:
+            path = await self.cache.save_download(
+                url, lambda path: self._cdn.download_to(url, path)
+            )
+        except Exception as e:
+            ttl = await self._negative.record(
+                url, str(e), self._ttl.negative, self._ttl.negative_max
+            )
+            logger.error(f"Failed to download image {url}, retrying in {ttl}s: {e}")
+            raise
+
+        self._schedule_placeholder(url)
+        return path
+
+    def _revalidate_if_stale(self, url: str) -> None:
+        """Start revalidating a cached image past its fresh TTL"""
+        if url in self._revalidations:
+            return
+        age = self.cache.age(url)
+        if age is None or age < self._ttl.fresh:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._revalidate(url))
+        self._revalidations[url] = task
+        task.add_done_callback(lambda _: self._revalidations.pop(url, None))
+
+    async def _revalidate(self, url: str) -> None:
+        """Refresh a cached image with a conditional GET"""
+        await self.wait_for_foreground()
+        previous_etag = self.cache.etag_for_key(self.cache.cache_key(url))
+        validators = self.cache.validators(url)
+        try:
+            await self._scheduler.run(
+                url,
+                lambda: self.cache.save_download(
+                    url, lambda path: self._cdn.download_to(url, path, **validators)
+                ),
+                Priority.BACKGROUND,
+            )
+        except Exception as e:
+            age = self.cache.age(url)
+            if age is not None and age >= self._ttl.retention:
+                # Stale for too long, fetched again when next shown
+                self.cache.discard_variants(url)
+                self.cache.remove(url)
+            logger.warning(f"Failed to revalidate image {url}: {e}")
+            return
+
+        etag = self.cache.etag_for_key(self.cache.cache_key(url))
+        if etag != previous_etag:
+            logger.info(f"Image changed upstream: {url}")
+            self.cache.discard_variants(url)
+            self._passthrough = {
+                key for key in self._passthrough if not key.startswith(f"{url}#")
+            }
+            self._schedule_placeholder(url)
+
+    async def _coalesce(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Run factory once per key, sharing the result with concurrent callers"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shielded so a disconnecting client does not cancel other waiters
+        return await asyncio.shield(future)
+
+    async def _get_thumbnail(
+        self, url: str, width: int, fmt: Optional[str]
+    ) -> Optional[Tuple[Path, str, Optional[str]]]:
+        """Get a resized variant of a cached image
+
+        Returns:
+            (path, mimetype, etag), or None if the original should be served
+        """
+        width = self._thumbnailer.snap_width(width)
+        fmt = self._thumbnailer.normalize_format(fmt)
+        mimetype = THUMBNAIL_FORMATS[fmt]
+        variant_key = self._variant_key(url, width, fmt)
+
+        if variant_key in self._passthrough:
+            return None
+
+        variant_path = self.cache.lookup(variant_key)
+        if variant_path is None:
+            variant_path = await self._coalesce(
+                variant_key,
+                lambda: self._render_thumbnail(url, variant_key, width, fmt),
+            )
+        if variant_path is None:
+            return None
+        return variant_path, mimetype, await self.cache.etag(variant_key)
+
+    def _variant_key(self, url: str, width: int, fmt: Optional[str]) -> str:
+        """Get the cache key of a thumbnail"""
+        width = self._thumbnailer.snap_width(width)
+        fmt = self._thumbnailer.normalize_format(fmt)
+        return f"{url}#w={width}.{fmt}"
+
+    async def _render_thumbnail(
+        self, url: str, variant_key: str, width: int, fmt: str
+    ) -> Optional[Path]:
+        """Render a thumbnail into the cache"""
+        data = await self.cache.load(url)
+        if data is None:
+            return None
+
+        try:
+            thumbnail = await self._thumbnailer.render(data, width, fmt)
+        except Exception as e:
+            logger.warning(f"Failed to create thumbnail of {url}: {e}")
+            thumbnail = None
+
+        if thumbnail is None:
+            self._passthrough.add(variant_key)
+            return None
+
+        return await self.cache.save(variant_key, thumbnail)
+
     def register_image(self, url: str) -> str:
-        image_id = str(random.randint(100000, 999999))
-        while image_id in self._url_mapping:
-            image_id = str(random.randint(100000, 999999))
+        """Register a URL and return its (stable) image ID"""
+        image_id = self.cache.cache_key(url)
 
         self._url_mapping[image_id] = url
+        self._url_mapping.move_to_end(image_id)
+        self._trim_registry()
         return image_id
 
-    def get_image_url(self, image_id: str) -> str:
-        return f"http://127.0.0.1:{self._port}/image/{image_id}"
+    def register_images(
+        self,
+        urls: Iterable[Optional[str]],
+        width: Optional[int] = None,
+        animated: bool = False,
+        inline: bool = False,
+        owner: Optional[Hashable] = None,
+    ) -> Dict[str, str]:
+        """Register many URLs at once
+
+        Args:
+            urls: Remote image URLs, empty ones are skipped
+            width: Display width in pixels, serves resized thumbnails
+            animated: The surface plays animated images
+            inline: Return ``data:`` URIs for small cached images, for
+                surfaces that render them (e.g. Markdown)
+            owner: Token whose cancel_owner cancels the downloads of the
+                local URLs' requests
+
+        Returns:
+            Remote URL -> local URL (or data URI)
+        """
+        local_urls = {}
+        for url in urls:
+            if not url or url in local_urls:
+                continue
+            remote_url = normalize_cdn_url(url, width, animated)
+            image_id = self.cache.cache_key(remote_url)
+            self._url_mapping[image_id] = remote_url
+            self._url_mapping.move_to_end(image_id)
+            local_urls[url] = (
+                inline and self._get_data_uri(remote_url, width)
+            ) or self.get_image_url(image_id, width=width, owner=owner)
+
+        self._trim_registry()
+        return local_urls
+
+    def get_placeholders(
+        self,
+        urls: Iterable[Optional[str]],
+        width: Optional[int] = None,
+        animated: bool = False,
+    ) -> Dict[str, str]:
+        """Get the placeholder colours of cached images
+
+        Images cached without one get it computed in the background.
+
+        Args:
+            urls: Remote image URLs, as passed to register_images
+            width: Display width in pixels, as passed to register_images
+            animated: As passed to register_images
+
+        Returns:
+            Remote URL -> ``#rrggbb`` colour, for the images that have one
+        """
+        colors = {}
+        for url in urls:
+            if not url or url in colors:
+                continue
+            remote_url = normalize_cdn_url(url, width, animated)
+            color = self.cache.placeholder(remote_url)
+            if color:
+                colors[url] = color
+            elif self.cache.exists(remote_url):
+                self._schedule_placeholder(remote_url)
+        return colors
+
+    def _schedule_placeholder(self, url: str) -> None:
+        if url in self._placeholder_tasks or not self._thumbnailer.available:
+            return
+        if self.is_remote:
+            # Computed by the instance that owns the cache
+            return
+        task = asyncio.get_running_loop().create_task(self._compute_placeholder(url))
+        self._placeholder_tasks[url] = task
+        task.add_done_callback(lambda _: self._placeholder_tasks.pop(url, None))
+
+    async def _compute_placeholder(self, url: str) -> None:
+        """Record the placeholder colour of a cached image"""
+        data = await self.cache.load(url)
+        if data is None:
+            return
+        try:
+            color = await self._thumbnailer.placeholder(data)
+        except Exception as e:
+            logger.debug(f"Failed to compute placeholder of {url}: {e}")
+            return
+        if color:
+            self.cache.set_placeholder(url, color)
+
+    def _get_data_uri(self, url: str, width: Optional[int]) -> Optional[str]:
+        """Get the memoized data URI of a small cached image
+
+        On a miss the image is encoded in the background for next time.
+        """
+        if self.is_remote:
+            return None
+
+        key = url
+        if width and self._thumbnailer.available:
+            variant_key = self._variant_key(url, width, None)
+            if variant_key not in self._passthrough:
+                key = variant_key
+
+        etag = self.cache.etag_for_key(self.cache.cache_key(key))
+        data_uri = self._data_uris.get(etag) if etag else None
+        if data_uri is None and self.cache.exists(url):
+            self._schedule_inline(url, width)
+        return data_uri
+
+    def _schedule_inline(self, url: str, width: Optional[int]) -> None:
+        if (url, width) in self._inline_tasks:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(
+                self._encode_inline(url, width)
+            )
+        except RuntimeError:
+            return
+        self._inline_tasks[(url, width)] = task
+        task.add_done_callback(lambda _: self._inline_tasks.pop((url, width), None))
+
+    async def _encode_inline(self, url: str, width: Optional[int]) -> None:
+        """Memoize the data URI of a cached image if it is small enough"""
+        try:
+            thumbnail = None
+            if width and self._thumbnailer.available:
+                thumbnail = await self._get_thumbnail(url, width, None)
+            if thumbnail is not None:
+                path, mimetype, etag = thumbnail
+            else:
+                path = self.cache.lookup(url)
+                mimetype = self.cache.content_type(url) or DEFAULT_MIMETYPE
+                etag = await self.cache.etag(url)
+
+            size = self.cache.file_size(path) if path else None
+            if etag is None or size is None or size > self._inline_max_bytes:
+                return
+            data = await asyncio.to_thread(path.read_bytes)
+        except Exception as e:
+            logger.debug(f"Failed to inline image {url}: {e}")
+            return
+
+        self._data_uris.put(etag, encode_data_uri(data, mimetype))
+
+    def _trim_registry(self) -> None:
+        """Forget the least recently used IDs beyond the registry size"""
+        while len(self._url_mapping) > self._max_registered_images:
+            self._url_mapping.popitem(last=False)
 
-    def _find_available_port(self) -> int:
-        import socket
+    def _resolve_image_id(self, image_id: str) -> Optional[str]:
+        """Get the URL of an image ID"""
+        url = self._url_mapping.get(image_id)
+        if url is not None:
+            self._url_mapping.move_to_end(image_id)
+            return url
 
-        for _ in range(10):
-            port = random.randint(*self.port_range)
+        # Evicted from the registry, but possibly still cached on disk
+        url = self.cache.url_for_key(image_id)
+        if url is not None:
+            self.register_image(url)
+        return url
+
+    def get_image_url(
+        self,
+        image_id: str,
+        width: Optional[int] = None,
+        owner: Optional[Hashable] = None,
+    ) -> str:
+        """Get the local URL of a registered image
+
+        Args:
+            image_id: ID returned by register_image
+            width: Display width in pixels, serves a resized thumbnail
+            owner: Token whose cancel_owner cancels the request's download
+
+        Returns:
+            The local URL, or the remote URL while no server is running
+            (it failed to start or stopped)
+        """
+        if not self.is_running:
+            return (
+                self._url_mapping.get(image_id)
+                or self.cache.url_for_key(image_id)
+                or ""
+            )
+
+        params = {}
+        if width:
+            params["w"] = self._thumbnailer.snap_width(width)
+        token = self._owner_token(owner)
+        if token:
+            params["owner"] = token
+        etag = self.cache.etag_for_key(image_id)
+        if etag:
+            # Versioned by content, served as immutable
+            params["v"] = etag
+
+        remote_url = self._url_mapping.get(image_id) if self._secret else None
+        if remote_url:
+            # Lets a server without this registration (another instance's)
+            # serve the URL
+            params["src"] = remote_url
+            params["sig"] = self._sign(remote_url)
+
+        url = f"http://127.0.0.1:{self._port}/image/{image_id}"
+        if params:
+            url += f"?{urlencode(params)}"
+        return url
+
+    def enable_signed_urls(self, secret: str) -> None:
+        """Sign local URLs with a secret shared by the app instances"""
+        self._secret = secret
+
+    def attach(self, port: int) -> None:
+        """Use the shared server of another instance instead of running one"""
+        self._remote_port = port
+        self._port = port
+        self._ready.set()
+        logger.info(f"Using the shared image server on port {port}")
+
+    @property
+    def is_remote(self) -> bool:
+        """Whether image requests go to another instance's server"""
+        return self._remote_port is not None
+
+    def _sign(self, url: str) -> str:
+        return hmac.new(
+            self._secret.encode(), url.encode(), hashlib.sha256
+        ).hexdigest()[:32]
+
+    def _resolve_signed(self, image_id: str) -> Optional[str]:
+        """Get the URL carried by a signed local URL (see enable_signed_urls)"""
+        url = request.args.get("src")
+        signature = request.args.get("sig", "")
+        if not url or not self._secret or self.cache.cache_key(url) != image_id:
+            return None
+        if not hmac.compare_digest(signature, self._sign(url)):
+            return None
+
+        self.register_image(url)
+        return url
+
+    def _bind(self, port: Optional[int] = None) -> socket.socket:
+        """Bind a listening socket to port, or a free port in port_range"""
+        for attempt in range(10):
+            if port is None or attempt > 0:
+                port = random.randint(*self.port_range)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if os.name != "nt":
+                # Rebinding the port of a server that just exited
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             try:
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.bind(("127.0.0.1", port))
-                    return port
+                sock.bind(("127.0.0.1", port))
+                sock.listen(self.LISTEN_BACKLOG)
+                return sock
             except OSError:
-                continue
+                sock.close()
 
         raise RuntimeError("No available port found")
 
-    async def start(self):
-        self._port = self._find_available_port()
+    async def start(self, port: Optional[int] = None):
+        """Run the server, see wait_until_ready
+
+        The socket is bound once and handed to the ASGI server, so the port
+        cannot be taken by someone else in between.
+
+        Args:
+            port: Preferred port, e.g. of a shared server taken over
+        """
+        if self._remote_port is not None:
+            # Taking over from the shared server this instance used
+            self._remote_port = None
+            self._ready.clear()
+
+        try:
+            sock = self._bind(port)
+        except Exception as e:
+            self._start_error = e
+            self._ready.set()
+            raise
+
+        self._port = sock.getsockname()[1]
         logger.info(f"Starting image server on port {self._port}")
 
-        config = self.app.config
-        config["SERVER_NAME"] = None
+        self.app.config["SERVER_NAME"] = None
 
-        await self.app.run_task(
-            host="127.0.0.1",
-            port=self._port,
-            debug=False,
-        )
+        # Configured here rather than through app.run_task, which only passes
+        # fd:// binds through as of Quart 0.22
+        config = HyperConfig()
+        config.access_log_format = "%(h)s %(r)s %(s)s %(b)s %(D)s"
+        config.accesslog = self.app.logger
+        config.errorlog = self.app.logger
+        # Hypercorn takes over the file descriptor
+        config.bind = [f"fd://{sock.detach()}"]
+
+        self._shutdown.clear()
+        try:
+            # With a shutdown trigger Hypercorn leaves the app's signal
+            # handlers (Ctrl+C, SIGTERM) alone
+            await serve(self.app, config, shutdown_trigger=self._shutdown.wait)
+        except Exception as e:
+            if not self._ready.is_set():
+                self._start_error = e
+                self._ready.set()
+            raise
+        finally:
+            self._port = None
+
+    async def wait_until_ready(self) -> int:
+        """Wait until the server accepts requests
+
+        Returns:
+            The port the server listens on
+
+        Raises:
+            Exception: The server failed to start
+        """
+        await self._ready.wait()
+        if self._start_error is not None:
+            raise self._start_error
+        return self._port
+
+    async def stop(self) -> None:
+        """Shut the server down, releasing the download pool and workers"""
+        self._shutdown.set()
+        for tasks in (self._revalidations, self._placeholder_tasks, self._inline_tasks):
+            for task in list(tasks.values()):
+                task.cancel()
+        await self._cdn.aclose()
+        if self._loopback is not None:
+            await self._loopback.aclose()
+            self._loopback = None
+        self._thumbnailer.shutdown()
 
     @property
     def port(self) -> Optional[int]:
@@ -0,0 +1,86 @@
+"""Image prefetcher"""
+
+import asyncio
+import logging
+from typing import List, Optional, Sequence, Set
+from .image_server import ImageServer
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePrefetcher:
+    """Warms the image cache for the items of a list before they are shown
+
+    The first ``window`` images are fetched when a list is shown, and the
+    window slides forward as the list scrolls. At most ``max_concurrency``
+    images are fetched at once, each waits while the image server is busy
+    with on-screen requests, and starting a new list cancels the old one.
+    """
+
+    def __init__(
+        self,
+        image_server: ImageServer,
+        window: int = 24,
+        max_concurrency: int = 4,
+    ):
+        self._server = image_server
+        self._window = window
+        self._max_concurrency = max_concurrency
+
+        self._urls: List[str] = []
+        self._width: Optional[int] = None
+        self._next = 0  # index of the next URL to fetch
+        self._limit = 0  # fetch URLs up to (excluding) this index
+        self._workers: Set[asyncio.Task] = set()
+
+    def start(self, urls: Sequence[Optional[str]], width: Optional[int] = None):
+        """Prefetch the images of a new list, in display order
+
+        Args:
+            urls: Image URLs in list order (empty entries are skipped)
+            width: Display width, also renders the matching thumbnails
+        """
+        self.cancel()
+        self._server.mark_activity()
+        self._urls = [url for url in urls if url]
+        self._width = width
+        self.advance(0)
+
+    def advance(self, index: int):
+        """Prefetch the window after the item at index (last visible one)
+
+        Must be called on the event loop (e.g. from an async event handler).
+        """
+        limit = min(len(self._urls), index + self._window)
+        if limit <= self._limit:
+            return
+
+        while len(self._workers) < self._max_concurrency and self._next < limit:
+            task = asyncio.create_task(self._work())
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+        # Raised once the workers are scheduled, they start on the next loop
+        # iteration
+        self._limit = limit
+
+    def cancel(self):
+        """Stop prefetching the current list"""
+        for task in self._workers:
+            task.cancel()
+        self._workers.clear()
+        self._urls = []
+        self._next = 0
+        self._limit = 0
+
+    async def _work(self):
+        while self._next < self._limit:
+            url = self._urls[self._next]
+            self._next += 1
+
+            await self._server.wait_for_foreground()
+            try:
+                await self._server.prefetch(url, self._width)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Failed to prefetch {url}: {e}")
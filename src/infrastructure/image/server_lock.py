@@ -0,0 +1,108 @@
+"""Lock file of the image server shared by app instances"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ServerAdvert:
+    """Image server advertised in the lock file"""
+
+    pid: int
+    port: int
+    secret: str
+
+
+class ImageServerLock:
+    """OS file lock held by the instance that runs the shared image server
+
+    The lock is released by the OS when the owner exits, however it exits,
+    so other instances can take over. While held, the file advertises the
+    owner's port and the secret that signs image URLs.
+    """
+
+    # Windows locks are mandatory, so a byte past the advert is locked
+    _LOCK_OFFSET = 1 << 20
+
+    def __init__(self, lock_file: Path):
+        self._lock_file = lock_file
+        self._file: Optional[IO[str]] = None
+
+    @property
+    def owned(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Try to take the lock without blocking"""
+        if self._file is not None:
+            return True
+
+        file = open(self._lock_file, "a+", encoding="utf-8")
+        try:
+            # The advert carries the URL signing secret
+            os.chmod(self._lock_file, 0o600)
+        except OSError:
+            pass
+        try:
+            if fcntl is not None:
+                # A record lock, unlike flock(), is not inherited by forked
+                # worker processes that could outlive the owner
+                fcntl.lockf(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                file.seek(self._LOCK_OFFSET)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            file.close()
+            return False
+
+        self._file = file
+        return True
+
+    def read(self) -> Optional[ServerAdvert]:
+        """Get the advertised server, None if not advertised (yet)"""
+        try:
+            if self._file is not None:
+                # Closing another descriptor of the file would drop the lock
+                self._file.seek(0)
+                text = self._file.read()
+            else:
+                text = self._lock_file.read_text(encoding="utf-8")
+            data = json.loads(text or "null")
+            if data is None:
+                return None
+            return ServerAdvert(int(data["pid"]), int(data["port"]), data["secret"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug(f"No image server advertised: {e}")
+            return None
+
+    def advertise(self, advert: Optional[ServerAdvert]) -> None:
+        """Replace the advert (None withdraws it), the lock must be held"""
+        data = "" if advert is None else json.dumps(advert.__dict__)
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def release(self) -> None:
+        """Withdraw the advert and release the lock"""
+        if self._file is None:
+            return
+        try:
+            self.advertise(None)
+        except OSError as e:
+            logger.warning(f"Failed to clear image server lock file: {e}")
+        self._file.close()
+        self._file = None
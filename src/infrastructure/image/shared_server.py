@@ -0,0 +1,65 @@
+"""Image server shared by app instances"""
+
+import asyncio
+import logging
+import os
+import secrets
+from typing import Optional
+from .image_server import ImageServer
+from .server_lock import ImageServerLock, ServerAdvert
+
+logger = logging.getLogger(__name__)
+
+
+class SharedImageServer:
+    """Runs one image server for all app instances using the same data_dir
+
+    The instance holding the lock file runs the server and advertises its
+    port there. Later instances attach to it and keep polling the lock;
+    when the owner exits one of them takes over on the same port and
+    secret, so the URLs already handed out stay valid. The image server
+    must be created with ``load_cache=False``: its cache is opened only
+    once this instance holds the lock.
+    """
+
+    def __init__(
+        self,
+        image_server: ImageServer,
+        lock: ImageServerLock,
+        poll_interval: float = 2.0,
+    ):
+        self._server = image_server
+        self._lock = lock
+        self._poll_interval = poll_interval
+
+    async def run(self) -> None:
+        """Use the shared server, running it once this instance owns the lock"""
+        attached: Optional[ServerAdvert] = None
+        while not self._lock.acquire():
+            advert = self._lock.read()
+            if advert is not None and advert != attached:
+                self._server.enable_signed_urls(advert.secret)
+                self._server.attach(advert.port)
+                attached = advert
+            await asyncio.sleep(self._poll_interval)
+
+        # The cache directory is only changed by the lock holder
+        self._server.cache.open()
+
+        # Left behind by an owner that crashed, or the one used until now
+        previous = self._lock.read() or attached
+        self._lock.advertise(None)
+        secret = previous.secret if previous else secrets.token_urlsafe(24)
+        self._server.enable_signed_urls(secret)
+
+        server_task = asyncio.create_task(
+            self._server.start(port=previous.port if previous else None)
+        )
+        try:
+            port = await self._server.wait_until_ready()
+            self._lock.advertise(ServerAdvert(os.getpid(), port, secret))
+            logger.info(f"Sharing the image server on port {port}")
+            await server_task
+        finally:
+            server_task.cancel()
+            self._lock.release()
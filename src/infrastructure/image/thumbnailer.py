@@ -0,0 +1,181 @@
+"""Image thumbnailer"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, originals are served without it
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTHS = (32, 64, 128, 256, 512, 1024)
+THUMBNAIL_FORMATS = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+
+def render_thumbnail(data: bytes, width: int, fmt: str) -> Optional[bytes]:
+    """Decode, resize and re-encode an image
+
+    Runs in a worker process, so it must stay a picklable module function.
+
+    Returns:
+        Encoded thumbnail, or None if the original should be served as-is
+        (animated images and images not wider than ``width``)
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        if getattr(image, "is_animated", False) or image.width <= width:
+            return None
+
+        height = max(1, round(image.height * width / image.width))
+        # Lets the JPEG decoder downscale while decoding
+        image.draft("RGB", (width, height))
+
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        if fmt == "jpeg" or not has_alpha:
+            image = image.convert("RGB")
+        else:
+            image = image.convert("RGBA")
+        image = image.resize((width, height), Image.LANCZOS)
+
+        output = io.BytesIO()
+        if fmt == "webp":
+            image.save(output, "WEBP", quality=80, method=4)
+        else:
+            image.save(output, "JPEG", quality=85, optimize=True, progressive=True)
+        return output.getvalue()
+
+
+def average_color(data: bytes) -> Optional[str]:
+    """Get the average colour of an image as ``#rrggbb``
+
+    Transparent pixels do not count. Runs in a worker process, so it must
+    stay a picklable module function.
+
+    Returns:
+        The colour, or None for a fully transparent image
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (64, 64))
+        # Premultiplied alpha, so the average is weighted by opacity
+        image = image.convert("RGBA").convert("RGBa")
+        pixel = image.resize((1, 1), Image.BOX).getpixel((0, 0))
+
+    r, g, b, a = pixel
+    if a == 0:
+        return None
+    r, g, b = (min(255, round(c * 255 / a)) for c in (r, g, b))
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def _worker_context():
+    """Get a start method whose workers do not inherit the app's descriptors
+
+    Forked workers would keep the image server's socket (and its port)
+    alive after the app exits.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None  # spawn, the default where fork is unavailable
+
+
+def _can_start_processes() -> bool:
+    """Whether worker processes can be started with a Python interpreter
+
+    Frozen apps (flet pack, PyInstaller) and embedded runtimes run as their
+    own binary, so spawned workers would start the app again.
+    """
+    if getattr(sys, "frozen", False):
+        return False
+    executable = os.path.basename(sys.executable or "").lower()
+    return executable.startswith("python")
+
+
+class Thumbnailer:
+    """Resizes images to display size in a process pool
+
+    The pool also computes the placeholder colours shown while images load.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._max_workers = max_workers
+        self._executor: Optional[Executor] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether thumbnails can be rendered (Pillow is installed)"""
+        return Image is not None
+
+    @staticmethod
+    def snap_width(width: int) -> int:
+        """Round a requested width up to a supported thumbnail width"""
+        for candidate in THUMBNAIL_WIDTHS:
+            if width <= candidate:
+                return candidate
+        return THUMBNAIL_WIDTHS[-1]
+
+    @staticmethod
+    def normalize_format(fmt: Optional[str]) -> str:
+        """Get a supported output format, WebP by default"""
+        fmt = (fmt or "webp").lower()
+        if fmt == "jpg":
+            fmt = "jpeg"
+        return fmt if fmt in THUMBNAIL_FORMATS else "webp"
+
+    async def render(self, data: bytes, width: int, fmt: str) -> Optional[bytes]:
+        """Render a thumbnail, see render_thumbnail"""
+        return await self._run(render_thumbnail, data, width, fmt)
+
+    async def placeholder(self, data: bytes) -> Optional[str]:
+        """Compute the placeholder colour of an image, see average_color"""
+        return await self._run(average_color, data)
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool as e:
+            logger.warning(f"Thumbnail process pool broke, using threads: {e}")
+            self._use_threads()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    def shutdown(self) -> None:
+        """Stop the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if not _can_start_processes():
+                logger.info("No Python interpreter for worker processes, using threads")
+                self._use_threads()
+                return self._executor
+            try:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers, mp_context=_worker_context()
+                )
+            except (NotImplementedError, OSError, ImportError) as e:
+                # Mobile and web runtimes cannot spawn processes
+                logger.warning(f"Process pool unavailable, using threads: {e}")
+                self._use_threads()
+        return self._executor
+
+    def _use_threads(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_workers, thread_name_prefix="thumbnail"
+        )
@@ -1,6 +1,6 @@
 """DCTW Server repository implementation"""
 
-from typing import List, Optional
+from typing import Callable, List, Optional
 from datetime import datetime, timezone
 import logging
 
@@ -15,7 +15,8 @@ from domain.discovery.value_objects import (
     InviteUrl,
 )
 from ..api import DctwApiClient
-from ..cache import CacheManager
+from ..cache import CacheManager, CatalogCache, NegativeCache
+from ..config import ResourceTtl
 
 logger = logging.getLogger(__name__)
 
@@ -23,40 +24,63 @@ logger = logging.getLogger(__name__)
 class DctwServerRepository(ServerRepository):
     """DCTW API-based Server repository implementation"""
 
-    CACHE_KEY = "servers:all"
-
-    def __init__(self, api_client: DctwApiClient, cache_manager: CacheManager):
+    RESOURCE = "servers"
+
+    def __init__(
+        self,
+        api_client: DctwApiClient,
+        cache_manager: CacheManager,
+        negative_cache: NegativeCache,
+        ttl: ResourceTtl,
+        snapshot_cache: Optional[CacheManager] = None,
+        snapshot_ttl: int = 30 * 24 * 3600,
+    ):
         self._api_client = api_client
-        self._cache = cache_manager
+        self._catalog: CatalogCache[Server] = CatalogCache(
+            self.RESOURCE,
+            cache_manager,
+            negative_cache,
+            ttl,
+            serialize=self._serialize_server,
+            deserialize=self._deserialize_server,
+            snapshot_cache=snapshot_cache,
+            snapshot_ttl=snapshot_ttl,
+        )
 
     async def find_all(self) -> List[Server]:
         """Get allServers"""
-        cached = await self._cache.get(self.CACHE_KEY)
-        if cached:
-            logger.info(f"Loading {len(cached)} servers from cache")
-            return [self._deserialize_server(data) for data in cached]
-
-        logger.info("Fetching servers from API")
-        data = await self._api_client.get_servers()
-        servers = [self._map_to_domain(item) for item in data]
-
-        await self._cache.set(
-            self.CACHE_KEY, [self._serialize_server(s) for s in servers], ttl=60
-        )
-
-        logger.info(f"Loaded {len(servers)} servers from API")
-        return servers
+        return await self._catalog.get_all(self._fetch_all)
 
     async def find_by_id(self, server_id: int) -> Optional[Server]:
         """Find Server by ID"""
-        servers = await self.find_all()
-        return next((s for s in servers if s.id == server_id), None)
+        return await self._catalog.find_by_id(server_id, self._fetch_all)
 
     async def clear_cache(self) -> None:
         """Clear cache"""
-        await self._cache.delete(self.CACHE_KEY)
+        await self._catalog.clear()
         logger.info("Server cache cleared")
 
+    async def wait_for_refresh(self) -> bool:
+        """Wait for a background refresh, True if newer data was loaded"""
+        return await self._catalog.wait_for_refresh()
+
+    def add_refresh_listener(self, listener: Callable[[], None]) -> None:
+        """Call listener after each successful refresh"""
+        self._catalog.add_refresh_listener(listener)
+
+    async def restore_snapshot(self) -> bool:
+        """Restore the persisted snapshot, True if one was restored"""
+        return await self._catalog.restore_snapshot()
+
+    async def save_snapshot(self) -> None:
+        """Persist the current data as snapshot"""
+        await self._catalog.save_snapshot()
+
+    async def _fetch_all(self) -> List[Server]:
+        """Fetch all servers from API"""
+        data = await self._api_client.get_servers()
+        return [self._map_to_domain(item) for item in data]
+
     def _map_to_domain(self, data: dict) -> Server:
         """Map API data to domain model"""
         server_id = int(data["id"])
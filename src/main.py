@@ -9,6 +9,7 @@ if str(src_dir) not in sys.path:
 import flet as ft
 import asyncio
 import logging
+import multiprocessing
 
 from presentation.pages import (
     BotListPage,
@@ -17,8 +18,11 @@ from presentation.pages import (
     TemplateListPage,
     SettingsPage,
 )
+from application.services import DiscoveryService
+from domain.discovery.value_objects import SortOption
+from infrastructure.config import get_settings
 from infrastructure.di import get_container
-from infrastructure.image import ImageServer
+from infrastructure.image import ImageServer, ImageCacheWarmer, SharedImageServer
 
 
 # Configure logging
@@ -52,15 +56,88 @@ async def main(page: ft.Page):
     container = get_container()
     image_server: ImageServer = container.resolve(ImageServer)
 
-    # Start image server asynchronously
-    asyncio.create_task(image_server.start())
-
-    # Wait a moment for server to start
-    await asyncio.sleep(0.5)
-    logger.info(f"Image server started on port {image_server.port}")
+    # Start image server asynchronously, or use the one of another instance
+    if get_settings().shared_image_server:
+        shared_image_server = container.resolve(SharedImageServer)
+        asyncio.create_task(shared_image_server.run())
+    else:
+        asyncio.create_task(image_server.start())
+
+    # Wait until the server accepts requests
+    try:
+        port = await asyncio.wait_for(image_server.wait_until_ready(), timeout=10)
+        logger.info(f"Image server started on port {port}")
+    except Exception as e:
+        logger.error(f"Image server failed to start: {e}")
+
+    # Restore the last catalog snapshots so lists render before the network
+    discovery_service: DiscoveryService = container.resolve(DiscoveryService)
+    await discovery_service.restore_snapshots()
+
+    # Cache catalog images in popularity order while the app is idle
+    cache_warmer: ImageCacheWarmer = container.resolve(ImageCacheWarmer)
+
+    async def warm_catalog_images():
+        """Warm the images of the current catalog"""
+        bots = await discovery_service.list_bots(sort_option=SortOption.VOTES)
+        servers = await discovery_service.list_servers(sort_option=SortOption.VOTES)
+        ranked = [
+            (bot.statistics.votes, bot.avatar.value, BotListPage.AVATAR_WIDTH)
+            for bot in bots
+        ]
+        ranked += [
+            (bot.statistics.votes, bot.banner.value, BotDetailPage.BANNER_WIDTH)
+            for bot in bots
+            if bot.banner
+        ]
+        ranked += [
+            (server.statistics.votes, server.icon.value, ServerListPage.ICON_WIDTH)
+            for server in servers
+        ]
+        ranked.sort(key=lambda job: job[0], reverse=True)
+        cache_warmer.start([(url, width) for _, url, width in ranked])
+
+    async def run_cache_warmer():
+        try:
+            await warm_catalog_images()
+        except Exception as e:
+            logger.warning(f"Failed to warm catalog images: {e}")
+
+    # Warm again with the new catalog after each refresh
+    discovery_service.add_catalog_refresh_listener(
+        lambda: page.run_task(run_cache_warmer)
+    )
+    page.run_task(run_cache_warmer)
+
+    async def on_window_event(e: ft.WindowEvent):
+        """Persist caches before the window closes"""
+        if e.type == ft.WindowEventType.CLOSE:
+            try:
+                cache_warmer.cancel()
+                await discovery_service.save_snapshots()
+                image_server.cache.flush()
+                await image_server.stop()
+            except Exception as error:
+                logger.error(f"Failed to persist caches on close: {error}")
+            finally:
+                # prevent_close is set, the window only closes from here
+                page.window.destroy()
+
+    async def on_disconnect(e):
+        """Persist caches when the session ends"""
+        cache_warmer.cancel()
+        await discovery_service.save_snapshots()
+        image_server.cache.flush()
+        await image_server.stop()
+
+    page.window.prevent_close = True
+    page.window.on_event = on_window_event
+    page.on_disconnect = on_disconnect
 
     # Current tab state
     current_tab = [0]
+    # Bot detail page currently shown, disposed when navigating away
+    current_detail = [None]
 
     # Create page instances
     bot_page = BotListPage(page)
@@ -143,6 +220,7 @@ async def main(page: ft.Page):
     def create_bot_detail_view(bot_id: str) -> ft.View:
         """Create bot detail view"""
         detail_page = BotDetailPage(page, bot_id)
+        current_detail[0] = detail_page
 
         return ft.View(
             f"/bot/{bot_id}",
@@ -166,6 +244,11 @@ async def main(page: ft.Page):
 
     def route_change(e):
         """Handle route changes"""
+        if current_detail[0] is not None:
+            # Route changes are handled in a worker thread, the downloads are
+            # cancelled on the event loop
+            page.run_task(current_detail[0].dispose)
+            current_detail[0] = None
         page.views.clear()
 
         # Always add home view
@@ -196,4 +279,6 @@ async def main(page: ft.Page):
 
 
 if __name__ == "__main__":
+    # Frozen builds re-run this script in thumbnailer worker processes
+    multiprocessing.freeze_support()
     ft.app(target=main)
@@ -1,16 +1,19 @@
 import flet as ft
-import re
 from typing import Optional
 from application.services import DiscoveryService
 from domain.discovery.entities import Bot
 from domain.shared import EntityNotFoundException
 from infrastructure.di import get_container
-from infrastructure.image import ImageServer
+from infrastructure.image import ImageServer, DiscordEmojiRewriter, Priority
 
 
 class BotDetailPage:
     """Bot detail page"""
 
+    # Thumbnail widths (px) of the header images, 2x their display size
+    AVATAR_WIDTH = 256
+    BANNER_WIDTH = 1024
+
     def __init__(self, page: ft.Page, bot_id: str):
         self._content_container = None
         self.page = page
@@ -20,7 +23,11 @@ class BotDetailPage:
             DiscoveryService
         )
         self.image_server: ImageServer = self.container.resolve(ImageServer)
+        self.emoji_rewriter: DiscordEmojiRewriter = self.container.resolve(
+            DiscordEmojiRewriter
+        )
         self._bot: Optional[Bot] = None
+        self._disposed = False
 
     def _get_tag_info(self, tag_name: str) -> tuple[str, str]:
         """Get tag display name and icon"""
@@ -63,34 +70,41 @@ class BotDetailPage:
 
         return status_texts.get(status, "未知")
 
-    def _cache_image(self, url: str) -> str:
-        """Cache image and return local URL"""
+    def _cache_image(self, url: str, width: Optional[int] = None) -> str:
+        """Cache image and return local URL
+
+        The download starts on behalf of this page, so leaving the page
+        cancels it.
+        """
 
         if not url:
             return ""
 
-        image_id = self.image_server.register_image(url)
+        self.page.run_task(self._fetch_image, url, width)
+        return self.image_server.register_images([url], width=width, owner=self)[url]
 
-        return self.image_server.get_image_url(image_id)
+    def _placeholder(self, url: str, width: Optional[int] = None) -> Optional[str]:
+        """Get the colour shown while an image loads"""
 
-    def _convert_discord_emojis(self, text: str) -> str:
-        if not text:
-            return ""
+        return self.image_server.get_placeholders([url], width=width).get(url)
 
-        # Replace animated emojis <a:name:id>
-        text = re.sub(
-            r"<a:\w*:(\d+)>",
-            r"![emoji](https://cdn.discordapp.com/emojis/\1.gif?size=32&quality=lossless)",
-            text,
-        )
+    async def _fetch_image(self, url: str, width: Optional[int]):
+        try:
+            await self.image_server.prefetch(
+                url, width, priority=Priority.ON_SCREEN, owner=self
+            )
+        except Exception:
+            # Reported by the image request of the control itself
+            pass
 
-        # Replace static emojis <:name:id>
-        text = re.sub(
-            r"<:\w*:(\d+)>",
-            r"![emoji](https://cdn.discordapp.com/emojis/\1.png?size=32&quality=lossless)",
-            text,
-        )
-        return text
+    async def dispose(self):
+        """Cancel the image downloads of this page, called when it is left
+
+        Runs on the event loop, see page.run_task.
+        """
+
+        self._disposed = True
+        self.image_server.cancel_owner(self)
 
     def build(self) -> ft.Control:
         """Build page UI"""
@@ -122,6 +136,8 @@ class BotDetailPage:
         try:
             bot_id_int = int(self.bot_id)
             self._bot = await self.discovery_service.get_bot_by_id(bot_id_int)
+            if self._disposed:
+                return
             self._render_bot_detail()
 
         except EntityNotFoundException as e:
@@ -181,7 +197,7 @@ class BotDetailPage:
                 # Introduction (Markdown)
                 ft.Container(
                     content=ft.Markdown(
-                        self._convert_discord_emojis(bot.introduce),
+                        self.emoji_rewriter.rewrite(bot.introduce, owner=self),
                         fit_content=False,
                         on_tap_link=lambda e: self.page.launch_url(e.data),
                     ),
@@ -214,8 +230,20 @@ class BotDetailPage:
 
     def _create_header_section(self, bot: Bot) -> ft.Control:
         """Create header section with banner and avatar"""
-        banner_url = self._cache_image(bot.banner.value) if bot.banner else ""
-        avatar_url = self._cache_image(bot.avatar.value)
+        banner_url = (
+            self._cache_image(bot.banner.value, width=self.BANNER_WIDTH)
+            if bot.banner
+            else ""
+        )
+        avatar_url = self._cache_image(bot.avatar.value, width=self.AVATAR_WIDTH)
+        banner_placeholder = (
+            self._placeholder(bot.banner.value, width=self.BANNER_WIDTH)
+            if bot.banner
+            else None
+        )
+        avatar_placeholder = self._placeholder(
+            bot.avatar.value, width=self.AVATAR_WIDTH
+        )
         status_color = self._get_status_color(bot.status.value)
 
         status_text = self._get_status_text(bot.status.value)
@@ -238,6 +266,7 @@ class BotDetailPage:
                 # Banner
                 ft.Container(
                     content=banner_content,
+                    bgcolor=banner_placeholder,
                     height=256,
                     expand=True,
                 ),
@@ -247,6 +276,7 @@ class BotDetailPage:
                         [
                             ft.CircleAvatar(
                                 foreground_image_src=avatar_url,
+                                bgcolor=avatar_placeholder,
                                 radius=64,
                             ),
                             ft.Container(
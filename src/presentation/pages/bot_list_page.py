@@ -15,11 +15,15 @@ from domain.discovery.value_objects import (
 )
 from domain.discovery.entities import Bot
 from infrastructure.di import get_container
+from infrastructure.image import ImagePrefetcher, ImageServer
 
 
 class BotListPage:
     """Bot list page"""
 
+    # Thumbnail width (px) of the card avatars, 2x their display size
+    AVATAR_WIDTH = 128
+
     def __init__(self, page: ft.Page):
         self.page = page
         self.container = get_container()
@@ -29,9 +33,17 @@ class BotListPage:
         self.preference_service: PreferenceService = self.container.resolve(
             PreferenceService
         )
+        self.image_server: ImageServer = self.container.resolve(ImageServer)
+        self.prefetcher: ImagePrefetcher = self.container.resolve(ImagePrefetcher)
 
         # UI組件
-        self.bot_list = ft.ListView(spacing=10, padding=20, expand=True)
+        self.bot_list = ft.ListView(
+            spacing=10,
+            padding=20,
+            expand=True,
+            on_scroll_interval=200,
+            on_scroll=self._on_scroll,
+        )
         self.search_field = ft.TextField(
             label="搜尋Bot",
             prefix_icon=ft.Icons.SEARCH,
@@ -85,6 +97,8 @@ class BotListPage:
 
     async def _load_bots(self):
         """Load list"""
+        # The query changed, images of the previous results are not needed
+        self.prefetcher.cancel()
         self.progress.visible = True
         self.page.update()
 
@@ -108,6 +122,11 @@ class BotListPage:
             # Render list
             self._render_bot_list(bots)
 
+            # Cached data may be stale, re-render once it is revalidated
+            self.page.run_task(
+                self._rerender_after_refresh, self._current_filter, sort_option
+            )
+
         except Exception as e:
             self._show_error(f"載入失敗: {str(e)}")
 
@@ -115,6 +134,26 @@ class BotListPage:
             self.progress.visible = False
             self.page.update()
 
+    async def _rerender_after_refresh(
+        self, filter_criteria: FilterCriteria, sort_option: SortOption
+    ):
+        """Re-render the list once a background refresh loaded newer data"""
+        try:
+            if not await self.discovery_service.wait_for_bot_refresh():
+                return
+            if filter_criteria is not self._current_filter:
+                # A newer query was loaded meanwhile
+                return
+
+            bots = await self.discovery_service.list_bots(
+                filter_criteria=filter_criteria,
+                sort_option=sort_option,
+            )
+            self._render_bot_list(bots)
+
+        except Exception as e:
+            self._show_error(f"載入失敗: {str(e)}")
+
     def _render_bot_list(self, bots: list[Bot]):
         """Render list"""
         self.bot_list.controls.clear()
@@ -128,12 +167,31 @@ class BotListPage:
                 )
             )
         else:
+            avatars = [bot.avatar.value for bot in bots]
+            avatar_urls = self.image_server.register_images(
+                avatars, width=self.AVATAR_WIDTH
+            )
+            placeholders = self.image_server.get_placeholders(
+                avatars, width=self.AVATAR_WIDTH
+            )
             for bot in bots:
-                self.bot_list.controls.append(self._create_bot_card(bot))
+                self.bot_list.controls.append(
+                    self._create_bot_card(
+                        bot,
+                        avatar_urls.get(bot.avatar.value),
+                        placeholders.get(bot.avatar.value),
+                    )
+                )
+
+        self.prefetcher.start(
+            [bot.avatar.value for bot in bots], width=self.AVATAR_WIDTH
+        )
 
         self.page.update()
 
-    def _create_bot_card(self, bot: Bot) -> ft.Control:
+    def _create_bot_card(
+        self, bot: Bot, avatar_src: Optional[str], placeholder: Optional[str] = None
+    ) -> ft.Control:
         """Create card"""
         status_colors = {
             "online": ft.Colors.GREEN,
@@ -165,7 +223,8 @@ class BotListPage:
                         ft.Row(
                             [
                                 ft.CircleAvatar(
-                                    foreground_image_src=bot.avatar.value,
+                                    foreground_image_src=avatar_src,
+                                    bgcolor=placeholder,
                                     radius=25,
                                 ),
                                 ft.Column(
@@ -264,6 +323,14 @@ class BotListPage:
         """Show details"""
         self.page.go(f"/bot/{bot.id}")
 
+    async def _on_scroll(self, e: ft.OnScrollEvent):
+        """Prefetch avatars of the cards about to scroll into view"""
+        extent = e.max_scroll_extent + e.viewport_dimension
+        if extent <= 0:
+            return
+        visible = (e.pixels + e.viewport_dimension) / extent
+        self.prefetcher.advance(int(len(self.bot_list.controls) * visible))
+
     async def _on_search(self):
         """Search event handler"""
         await self._load_bots()
@@ -15,11 +15,16 @@ from domain.discovery.value_objects import (
 )
 from domain.discovery.entities import Server
 from infrastructure.di import get_container
+from infrastructure.image import ImagePrefetcher, ImageServer
 
 
 class ServerListPage:
     """Server list page"""
 
+    # Thumbnail widths (px) of the card and dialog icons, 2x their display size
+    ICON_WIDTH = 128
+    DIALOG_ICON_WIDTH = 256
+
     def __init__(self, page: ft.Page):
         self.page = page
         self.container = get_container()
@@ -29,9 +34,17 @@ class ServerListPage:
         self.preference_service: PreferenceService = self.container.resolve(
             PreferenceService
         )
+        self.image_server: ImageServer = self.container.resolve(ImageServer)
+        self.prefetcher: ImagePrefetcher = self.container.resolve(ImagePrefetcher)
 
         # UI組件
-        self.server_list = ft.ListView(spacing=10, padding=20, expand=True)
+        self.server_list = ft.ListView(
+            spacing=10,
+            padding=20,
+            expand=True,
+            on_scroll_interval=200,
+            on_scroll=self._on_scroll,
+        )
         self.search_field = ft.TextField(
             label="搜尋Server",
             prefix_icon=ft.Icons.SEARCH,
@@ -86,6 +99,8 @@ class ServerListPage:
 
     async def _load_servers(self):
         """Load list"""
+        # The query changed, images of the previous results are not needed
+        self.prefetcher.cancel()
         self.progress.visible = True
         self.page.update()
 
@@ -107,6 +122,11 @@ class ServerListPage:
 
             self._render_server_list(servers)
 
+            # Cached data may be stale, re-render once it is revalidated
+            self.page.run_task(
+                self._rerender_after_refresh, self._current_filter, sort_option
+            )
+
         except Exception as e:
             print(f"Error loading servers: {e}")
             self._show_error(f"載入失敗: {str(e)}")
@@ -115,6 +135,27 @@ class ServerListPage:
             self.progress.visible = False
             self.page.update()
 
+    async def _rerender_after_refresh(
+        self, filter_criteria: FilterCriteria, sort_option: SortOption
+    ):
+        """Re-render the list once a background refresh loaded newer data"""
+        try:
+            if not await self.discovery_service.wait_for_server_refresh():
+                return
+            if filter_criteria is not self._current_filter:
+                # A newer query was loaded meanwhile
+                return
+
+            servers = await self.discovery_service.list_servers(
+                filter_criteria=filter_criteria,
+                sort_option=sort_option,
+            )
+            self._render_server_list(servers)
+
+        except Exception as e:
+            print(f"Error refreshing servers: {e}")
+            self._show_error(f"載入失敗: {str(e)}")
+
     def _render_server_list(self, servers: list[Server]):
         """Render list"""
         self.server_list.controls.clear()
@@ -128,12 +169,23 @@ class ServerListPage:
                 )
             )
         else:
+            icon_urls = self.image_server.register_images(
+                (server.icon.value for server in servers), width=self.ICON_WIDTH
+            )
             for server in servers:
-                self.server_list.controls.append(self._create_server_card(server))
+                self.server_list.controls.append(
+                    self._create_server_card(server, icon_urls.get(server.icon.value))
+                )
+
+        self.prefetcher.start(
+            [server.icon.value for server in servers], width=self.ICON_WIDTH
+        )
 
         self.page.update()
 
-    def _create_server_card(self, server: Server) -> ft.Control:
+    def _create_server_card(
+        self, server: Server, icon_src: Optional[str]
+    ) -> ft.Control:
         """Create card"""
         tag_chips = [
             ft.Chip(label=ft.Text(tag.name), bgcolor=ft.Colors.GREEN_100)
@@ -153,7 +205,7 @@ class ServerListPage:
                         ft.Row(
                             [
                                 ft.CircleAvatar(
-                                    foreground_image_src=server.icon.value,
+                                    foreground_image_src=icon_src,
                                     radius=25,
                                 ),
                                 ft.Column(
@@ -232,11 +284,15 @@ class ServerListPage:
 
     def _show_server_detail(self, server: Server):
         """Show details"""
+        icon_url = server.icon.value
+        icon_src = self.image_server.register_images(
+            [icon_url], width=self.DIALOG_ICON_WIDTH
+        ).get(icon_url)
         dialog = ft.AlertDialog(
             title=ft.Text(server.name),
             content=ft.Column(
                 [
-                    ft.Image(src=server.icon.value, width=100, height=100),
+                    ft.Image(src=icon_src, width=100, height=100),
                     ft.Text(f"描述: {server.description}"),
                     ft.Text(f"投票: {server.statistics.votes}"),
                     ft.Text(f"成員: {server.statistics.members}"),
@@ -263,6 +319,14 @@ class ServerListPage:
         dialog.open = False
         self.page.update()
 
+    async def _on_scroll(self, e: ft.OnScrollEvent):
+        """Prefetch icons of the cards about to scroll into view"""
+        extent = e.max_scroll_extent + e.viewport_dimension
+        if extent <= 0:
+            return
+        visible = (e.pixels + e.viewport_dimension) / extent
+        self.prefetcher.advance(int(len(self.server_list.controls) * visible))
+
     async def _on_search(self):
         """Search event handler"""
         await self._load_servers()
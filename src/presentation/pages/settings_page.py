@@ -9,6 +9,7 @@ import asyncio
 from application.services import PreferenceService
 from domain.preferences.value_objects import Theme, UpdateCheck
 from infrastructure.di import get_container
+from infrastructure.image import ImageServer
 
 from application.services import DiscoveryService
 
@@ -20,6 +21,7 @@ class SettingsPage:
         self.page = page
         self.container = get_container()
         self.pref_service: PreferenceService = self.container.resolve(PreferenceService)
+        self.image_server: ImageServer = self.container.resolve(ImageServer)
 
         # UI組件
         self.theme_dropdown = ft.Dropdown(
@@ -53,6 +55,8 @@ class SettingsPage:
             on_change=lambda e: self.page.run_task(self._on_update_check_changed, e),
         )
 
+        self.image_cache_usage = ft.Text(size=14, color=ft.Colors.GREY)
+
     def build(self) -> ft.Control:
         """Build page UI"""
         # Load current settings
@@ -100,6 +104,7 @@ class SettingsPage:
                             # Cache management
                             ft.Text("緩存", size=18, weight=ft.FontWeight.BOLD),
                             ft.Divider(),
+                            self.image_cache_usage,
                             ft.OutlinedButton(
                                 "清除所有緩存",
                                 icon=ft.Icons.DELETE_SWEEP,
@@ -127,6 +132,7 @@ class SettingsPage:
             self.nsfw_switch.value = prefs.nsfw_filter.is_enabled
             self.api_key_field.value = prefs.api_key.value or ""
             self.update_check_dropdown.value = prefs.update_check.value
+            self._update_image_cache_usage()
 
             self.page.update()
 
@@ -200,6 +206,20 @@ class SettingsPage:
             print(f"Error clearing cache: {e}")
             self._show_error(f"Clear cache失敗: {str(e)}")
 
+    def _update_image_cache_usage(self):
+        """Show image cache disk and memory usage"""
+        usage = self.image_server.cache.usage()
+        used_mb = usage["bytes"] / (1024 * 1024)
+        max_mb = usage["max_bytes"] / (1024 * 1024)
+        hot = self.image_server.hot_cache.stats()
+        lookups = hot["hits"] + hot["misses"]
+        hit_rate = hot["hits"] / lookups * 100 if lookups else 0
+        self.image_cache_usage.value = (
+            f"圖片緩存: {used_mb:.1f} MB / {max_mb:.0f} MB ({usage['entries']} 張)\n"
+            f"記憶體緩存: {hot['bytes'] / 1024:.0f} KB ({hot['entries']} 張, "
+            f"命中率 {hit_rate:.0f}%)"
+        )
+
     def _show_success(self, message: str):
         """Show success message"""
         snack = ft.SnackBar(
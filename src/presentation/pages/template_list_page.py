@@ -107,6 +107,11 @@ class TemplateListPage:
 
             self._render_template_list(templates)
 
+            # Cached data may be stale, re-render once it is revalidated
+            self.page.run_task(
+                self._rerender_after_refresh, self._current_filter, sort_option
+            )
+
         except Exception as e:
             print(f"Error loading templates: {e}")
             self._show_error(f"載入失敗: {str(e)}")
@@ -115,6 +120,27 @@ class TemplateListPage:
             self.progress.visible = False
             self.page.update()
 
+    async def _rerender_after_refresh(
+        self, filter_criteria: FilterCriteria, sort_option: SortOption
+    ):
+        """Re-render the list once a background refresh loaded newer data"""
+        try:
+            if not await self.discovery_service.wait_for_template_refresh():
+                return
+            if filter_criteria is not self._current_filter:
+                # A newer query was loaded meanwhile
+                return
+
+            templates = await self.discovery_service.list_templates(
+                filter_criteria=filter_criteria,
+                sort_option=sort_option,
+            )
+            self._render_template_list(templates)
+
+        except Exception as e:
+            print(f"Error refreshing templates: {e}")
+            self._show_error(f"載入失敗: {str(e)}")
+
     def _render_template_list(self, templates: list[Template]):
         """Render list"""
         self.template_list.controls.clear()